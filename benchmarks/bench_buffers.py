@@ -0,0 +1,131 @@
+"""Compare the bulk frame buffer conversion with the original per-byte loops.
+
+Covers the 1-bpp getbuffer/display path and the 4-gray getbuffer_4Gray/display_4Gray path.
+
+Runs without hardware: a stand-in epdconfig records what would go over SPI.
+
+    python benchmarks/bench_buffers.py
+"""
+import time
+
+from PIL import Image, ImageDraw
+
+from fake_epdconfig import install_fake_epdconfig
+
+
+def legacy_getbuffer(epd, image):
+    buf = bytearray(image.convert('1').tobytes('raw'))
+    for i in range(len(buf)):
+        buf[i] ^= 0xFF
+    return buf
+
+
+def legacy_planes(epd, image):
+    Width = epd.width // 8
+    image1 = [0xFF] * int(epd.width * epd.height / 8)
+    for j in range(epd.height):
+        for i in range(Width):
+            image1[i + j * Width] = ~image[i + j * Width]
+    return image1, image
+
+
+def legacy_getbuffer_4Gray(epd, image):
+    buf = [0xFF] * (int(epd.width / 4) * epd.height)
+    pixels = image.convert('L').load()
+    i = 0
+    for y in range(epd.height):
+        for x in range(epd.width):
+            if pixels[x, y] == 0xC0:
+                pixels[x, y] = 0x80
+            elif pixels[x, y] == 0x80:
+                pixels[x, y] = 0x40
+            i = i + 1
+            if i % 4 == 0:
+                buf[int((x + (y * epd.width)) / 4)] = ((pixels[x-3, y] & 0xc0) | (pixels[x-2, y] & 0xc0) >> 2 | (pixels[x-1, y] & 0xc0) >> 4 | (pixels[x, y] & 0xc0) >> 6)
+    return buf
+
+
+def legacy_planes_4Gray(image):
+    # Per-pixel plane bits the original display_4Gray sent one byte at a time
+    old_bit = {0xC0: 0, 0x00: 1, 0x80: 1, 0x40: 0}
+    new_bit = {0xC0: 0, 0x00: 1, 0x80: 0, 0x40: 1}
+    planes = []
+    for bits in (old_bit, new_bit):
+        plane = bytearray(len(image) // 2)
+        for i in range(len(plane)):
+            temp3 = 0
+            for temp1 in image[i * 2:i * 2 + 2]:
+                for k in range(4):
+                    temp3 = (temp3 << 1) | bits[(temp1 << (2 * k)) & 0xC0]
+            plane[i] = temp3
+        planes.append(bytes(plane))
+    return tuple(planes)
+
+
+def gray_sample(width, height):
+    image = sample_frame(width, height).convert('L')
+    draw = ImageDraw.Draw(image)
+    for index, level in enumerate((0x00, 0x40, 0x80, 0xC0, 0x9A)):
+        draw.rectangle((index * width // 5, height - 60, (index + 1) * width // 5, height), fill=level)
+    return image
+
+
+def sample_frame(width, height):
+    image = Image.new('1', (width, height), 255)
+    draw = ImageDraw.Draw(image)
+    for y in range(0, height, 24):
+        draw.text((10, y), "Stratford - 12:01 | 12:05 | 12:09 | 12:14", fill=0)
+    draw.line((0, 50, width, 50), fill=0, width=5)
+    return image
+
+
+def timed(fn, *args, repeat=5):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    sent = install_fake_epdconfig()
+    from waveshare_epd import epd7in5_V2
+
+    epd = epd7in5_V2.EPD()
+    image = sample_frame(epd.width, epd.height)
+
+    legacy_time, legacy_buf = timed(legacy_getbuffer, epd, image)
+    bulk_time, bulk_buf = timed(epd.getbuffer, image)
+    assert legacy_buf == bulk_buf, "getbuffer output differs"
+    print(f"getbuffer   legacy {legacy_time * 1000:8.2f} ms   bulk {bulk_time * 1000:8.2f} ms   x{legacy_time / bulk_time:.0f}")
+
+    legacy_time, (legacy_old, _) = timed(legacy_planes, epd, bulk_buf)
+    bulk_time, (bulk_old, _) = timed(epd.getplanes, bulk_buf)
+    assert bytes(b & 0xFF for b in legacy_old) == bulk_old, "display planes differ"
+    print(f"planes      legacy {legacy_time * 1000:8.2f} ms   bulk {bulk_time * 1000:8.2f} ms   x{legacy_time / bulk_time:.0f}")
+
+    sent.clear()
+    epd.display(bulk_buf)
+    assert sent == [b'\x10', bytes(b & 0xFF for b in legacy_old), b'\x13', bytes(bulk_buf), b'\x12', b'\x71'], "display transfer differs"
+    print("display() transfers are byte-identical to the original loops")
+
+    gray = gray_sample(epd.width, epd.height)
+    legacy_time, legacy_gray = timed(legacy_getbuffer_4Gray, epd, gray, repeat=1)
+    bulk_time, bulk_gray = timed(epd.getbuffer_4Gray, gray)
+    assert bytes(legacy_gray) == bytes(bulk_gray), "getbuffer_4Gray output differs"
+    print(f"4Gray buf   legacy {legacy_time * 1000:8.2f} ms   bulk {bulk_time * 1000:8.2f} ms   x{legacy_time / bulk_time:.0f}")
+
+    legacy_time, legacy_planes4 = timed(legacy_planes_4Gray, bulk_gray, repeat=1)
+    bulk_time, bulk_planes4 = timed(epd.getplanes_4Gray, bulk_gray)
+    assert legacy_planes4 == bulk_planes4, "4Gray planes differ"
+    print(f"4Gray planes legacy {legacy_time * 1000:7.2f} ms   bulk {bulk_time * 1000:8.2f} ms   x{legacy_time / bulk_time:.0f}")
+
+    sent.clear()
+    epd.display_4Gray(bulk_gray)
+    assert sent == [b'\x10', legacy_planes4[0], b'\x13', legacy_planes4[1], b'\x12', b'\x71'], "display_4Gray transfer differs"
+    print("display_4Gray() sends each plane in one transfer, byte-identical to the original loops")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,235 @@
+"""Time and peak memory of the hot paths, compared against a stored baseline.
+
+Runs without hardware or network. Arrivals come from recorded TfL payloads
+in benchmarks/fixtures (a quiet stop, a bus stop and a busy hub), and a
+stand-in epdconfig swallows what would go over SPI.
+
+    python benchmarks/bench_suite.py                  # compare with baseline.json
+    python benchmarks/bench_suite.py --save-baseline  # record a new baseline
+    python benchmarks/bench_suite.py -k parse         # only stages matching "parse"
+
+Each stage reports the median and best wall time over repeated runs and
+the peak Python heap traced while it runs once (Pillow's pixel buffers are
+allocated outside the Python heap and do not show). A stage whose best
+time or peak exceeds the baseline by more than the tolerance is flagged
+and the exit status is 1.
+Timings only compare on the machine that recorded the baseline, so record
+it on the Pi that drives the panel.
+"""
+import argparse
+import json
+import platform
+import statistics
+import sys
+import time
+import tracemalloc
+from pathlib import Path
+
+from PIL import ImageDraw
+
+from fake_epdconfig import install_fake_epdconfig
+
+ROOT = Path(__file__).resolve().parent
+FIXTURES = ROOT / 'fixtures'
+BASELINE = ROOT / 'baseline.json'
+
+sys.path.insert(0, str(ROOT.parent))
+
+# fixture -> (platform to group by, lines to group by)
+FIXTURE_QUERIES = {
+    'quiet_stop': ('Southbound - Platform 2', ['jubilee']),
+    'bus_stop': ('B', ['183', 'sl10']),
+    'busy_hub': ('Southbound - Platform 5', ['metropolitan', 'jubilee']),
+}
+
+MIN_TIME = 0.2      # seconds each stage is repeated for
+MIN_REPEAT = 3
+MAX_REPEAT = 200
+
+
+def load_fixture(name):
+    return (FIXTURES / f"{name}.json").read_bytes()
+
+
+def measure(fn):
+    """Return (median_ms, best_ms, peak_kib) for calls of fn()."""
+    fn()  # warm up caches and lazy initialisation
+    times = []
+    started = time.perf_counter()
+    while len(times) < MAX_REPEAT and (len(times) < MIN_REPEAT or time.perf_counter() - started < MIN_TIME):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    before = tracemalloc.get_traced_memory()[0]
+    fn()
+    peak = tracemalloc.get_traced_memory()[1] - before
+    tracemalloc.stop()
+    return statistics.median(times) * 1000, min(times) * 1000, peak / 1024
+
+
+def arrival_stages(tfl, json_stream):
+    stages = {}
+    parsed = {}
+    for name, (platform_name, line_ids) in FIXTURE_QUERIES.items():
+        body = load_fixture(name)
+        arrivals = tfl.parse_arrivals(json.loads(body))
+        parsed[name] = arrivals
+        stages[f"parse.{name}"] = lambda body=body: [
+            tfl.parse_arrival(raw) for raw in json_stream.iter_array(json_stream.iter_bytes(body))
+        ]
+        stages[f"group_platform.{name}"] = lambda a=arrivals, p=platform_name: tfl.group_arrivals_by_platform(a, p)
+        stages[f"group_line.{name}"] = lambda a=arrivals, l=line_ids: tfl.group_arrivals_by_line(a, l)
+        stages[f"format_time.{name}"] = lambda a=arrivals: [
+            tfl.format_time_to_station(arrival.time_to_station, arrival.expected) for arrival in a
+        ]
+    return stages, parsed
+
+
+def screen_arrivals(main, parsed):
+    """What fetch_sources() returns, served from the fixtures."""
+    arrivals = {
+        main.kingsbury_station_id: parsed['quiet_stop'],
+        main.wembley_park_station_id: parsed['busy_hub'],
+    }
+    for bus in main.bus_list:
+        arrivals[bus['station_id']] = parsed['bus_stop']
+    return arrivals, set()
+
+
+def gray_frame(frame):
+    """The frame as a four-level grayscale image, as display_4Gray expects."""
+    image = frame.convert('L')
+    draw = ImageDraw.Draw(image)
+    width, height = image.size
+    for index, level in enumerate((0x00, 0x80, 0xC0)):
+        draw.rectangle((index * width // 3, height - 60, (index + 1) * width // 3, height), fill=level)
+    return image
+
+
+def panel_stages(epd, frame):
+    buffer = epd.getbuffer(frame)
+    gray = gray_frame(frame)
+    gray_buffer = epd.getbuffer_4Gray(gray)
+    return {
+        'getbuffer': lambda: epd.getbuffer(frame),
+        'getbuffer_4Gray': lambda: epd.getbuffer_4Gray(gray),
+        'display': lambda: epd.display(buffer),
+        'display_4Gray': lambda: epd.display_4Gray(gray_buffer),
+        'display_Partial': lambda: epd.display_Partial(buffer, 0, 0, epd.width, epd.height),
+        'display_Partial_window': lambda: epd.display_Partial_window(buffer, 0, 95, epd.width, 120),
+    }
+
+
+def build_stages():
+    sent = install_fake_epdconfig()
+    from waveshare_epd import epd7in5_V2
+    import json_stream
+    import tfl
+
+    stages, parsed = arrival_stages(tfl, json_stream)
+
+    try:
+        import main
+    except OSError as e:
+        # main loads its font from the Pi's pic directory
+        print(f"Skipping render: {e}")
+        from bench_buffers import sample_frame
+        frame = sample_frame(epd7in5_V2.EPD_WIDTH, epd7in5_V2.EPD_HEIGHT)
+    else:
+        arrivals = screen_arrivals(main, parsed)
+        main.fetch_sources = lambda: arrivals
+        stages['generate_image'] = main.generate_image
+        frame = main.generate_image()
+
+    epd = epd7in5_V2.EPD()
+    for name, fn in panel_stages(epd, frame).items():
+        # Drop the captured SPI traffic so it does not count as the stage's memory
+        stages[name] = lambda fn=fn: (fn(), sent.clear())
+    return stages
+
+
+def load_baseline(path):
+    try:
+        with open(path, 'r') as file:
+            return json.load(file)
+    except (OSError, ValueError):
+        return None
+
+
+def machine():
+    return f"{platform.machine()} {platform.python_implementation()} {platform.python_version()}"
+
+
+def report(results, baseline, tolerance):
+    """Print one line per stage and return the names of regressed stages."""
+    base = baseline['stages'] if baseline else {}
+    if baseline is None:
+        print("No baseline to compare with, record one with --save-baseline")
+    if baseline and baseline.get('machine') != machine():
+        print(f"Baseline was recorded on {baseline.get('machine')}, timings may not compare")
+
+    regressed = []
+    print(f"{'stage':32} {'median ms':>10} {'best ms':>10} {'peak KiB':>10} {'vs baseline':>14}")
+    for name, (median, best, peak) in results.items():
+        line = f"{name:32} {median:10.3f} {best:10.3f} {peak:10.1f}"
+        previous = base.get(name)
+        if previous:
+            # Best times are the least noisy; small allowances keep tiny stages from flagging
+            ratio = best / previous['best_ms'] if previous['best_ms'] else 1.0
+            slower = best > previous['best_ms'] * (1 + tolerance) + 0.02
+            hungrier = peak > previous['peak_kib'] * (1 + tolerance) + 4
+            line += f" {ratio:13.2f}x"
+            if slower or hungrier:
+                line += "  REGRESSION" + (" (time)" if slower else "") + (" (memory)" if hungrier else "")
+                regressed.append(name)
+        print(line)
+    return regressed
+
+
+def save_baseline(path, results):
+    baseline = {
+        'machine': machine(),
+        'stages': {
+            name: {'median_ms': round(median, 4), 'best_ms': round(best, 4), 'peak_kib': round(peak, 1)}
+            for name, (median, best, peak) in results.items()
+        },
+    }
+    with open(path, 'w') as file:
+        json.dump(baseline, file, indent=2)
+        file.write('\n')
+    print(f"Baseline saved to {path}")
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark parsing, rendering and buffer conversion")
+    parser.add_argument('-k', dest='pattern', help="only run stages whose name contains this")
+    parser.add_argument('--baseline', type=Path, default=BASELINE, help="baseline file to compare with or save to")
+    parser.add_argument('--save-baseline', action='store_true', help="record these results as the new baseline")
+    parser.add_argument('--tolerance', type=float, default=0.25, help="allowed slowdown before a stage is flagged, e.g. 0.25 for 25%%")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    stages = build_stages()
+    if args.pattern:
+        stages = {name: fn for name, fn in stages.items() if args.pattern in name}
+
+    results = {name: measure(fn) for name, fn in stages.items()}
+
+    if args.save_baseline:
+        report(results, {'machine': machine(), 'stages': {}}, args.tolerance)
+        save_baseline(args.baseline, results)
+        return 0
+    regressed = report(results, load_baseline(args.baseline), args.tolerance)
+    if regressed:
+        print(f"{len(regressed)} stage(s) regressed: {', '.join(regressed)}")
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,156 @@
+"""Check that a full refresh makes one upstream request per distinct stop.
+
+A local stand-in server answers every arrivals query from sources.json
+with predictions for the platforms and lines asked for and for others
+besides, and a different number of them per stop. A full refresh is
+drawn on the virtual panel backend, with the stored predictions, frame
+and metrics kept in a temporary directory. Checks that:
+
+    - each distinct stop was requested exactly once
+    - every section shows only its own stop's arrivals, on its platform
+      or lines
+
+    python benchmarks/check_batching.py
+"""
+import http.server
+import json
+import os
+import re
+import sys
+import tempfile
+import threading
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+# A platform and a line every response carries besides the ones on screen
+OTHER_PLATFORM = 'Northbound - Platform 1'
+OTHER_LINE = '302'
+
+with open(ROOT / 'sources.json') as file:
+    SOURCES = json.load(file)
+
+
+def predictions(station_id, platforms, lines, count):
+    """count predictions for every platform and line, expected a minute apart from two minutes out."""
+    now = time.time()
+    out = []
+    for platform, line in [(p, OTHER_LINE) for p in platforms] + [(None, l) for l in lines]:
+        for i in range(count):
+            seconds = 120 + 60 * i
+            out.append({
+                'platformName': platform, 'lineId': line, 'destinationName': f"{station_id} {line}",
+                'timeToStation': seconds, 'vehicleId': str(i), 'currentLocation': f"Near {station_id}",
+                'expectedArrival': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime(now + seconds)),
+            })
+    return out
+
+
+class ArrivalsServer:
+    """Answers StopPoint and Line arrivals queries, count[station_id] predictions per platform and line."""
+
+    def __init__(self, count):
+        self.count = count
+        self.log = []       # path of every request
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                with server._lock:
+                    server.log.append(self.path)
+                body = json.dumps(server._answer(self.path)).encode()
+                self.send_response(200)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def _answer(self, path):
+        stop = re.fullmatch(r'/StopPoint/([^/]+)/Arrivals', path)
+        if stop:
+            station_id = stop.group(1)
+            return predictions(station_id, [self._platform(station_id), OTHER_PLATFORM], [], self.count[station_id])
+        lines, station_id = re.fullmatch(r'/Line/([^/]+)/Arrivals/([^/]+)', path).groups()
+        # Real line-scoped answers only carry the lines asked for; the extra one shows the filter works
+        return predictions(station_id, [], lines.split(',') + [OTHER_LINE], self.count[station_id])
+
+    @staticmethod
+    def _platform(station_id):
+        tube = {stop['station_id']: stop['platform'] for stop in SOURCES['tube'].values()}
+        return tube.get(station_id)
+
+    def close(self):
+        self._httpd.shutdown()
+
+
+def check_full_refresh():
+    stops = [stop['station_id'] for stop in SOURCES['tube'].values()] + [bus['station_id'] for bus in SOURCES['bus']]
+    count = {station_id: index + 1 for index, station_id in enumerate(dict.fromkeys(stops))}
+    server = ArrivalsServer(count)
+
+    workdir = tempfile.mkdtemp(prefix='check_batching.')
+    os.environ.update(
+        TFL_API_BASE=server.url, EPD_BACKEND='virtual',
+        PREDICTIONS_FILE=os.path.join(workdir, 'predictions.json'),
+        FRAME_STORE=os.path.join(workdir, 'frame.bin'),
+        METRICS_LOG=os.path.join(workdir, 'metrics.jsonl'),
+        METRICS_TEXTFILE=os.path.join(workdir, 'tubetracker.prom'),
+        TEMPLATE_CACHE_DIR=os.path.join(workdir, 'cache'),
+    )
+    os.chdir(ROOT)
+    import main
+
+    main.service_hours = None  # poll whatever the time of day
+    grouped = []
+    group_sources = main.group_sources
+    main.group_sources = lambda arrivals, stale: grouped.append(group_sources(arrivals, stale)) or grouped[-1]
+    main.full_refresh()
+    server.close()
+
+    requested = {}
+    for path in server.log:
+        station_id = path.split('/')[2] if path.startswith('/StopPoint/') else path.rsplit('/', 1)[1]
+        requested[station_id] = requested.get(station_id, 0) + 1
+    assert requested == dict.fromkeys(count, 1), f"requests per stop: {requested}"
+
+    result = grouped[-1]
+    tube = SOURCES['tube']
+    kingsbury = result['kingsburyLatestArrivals']
+    assert len(kingsbury['arrival_times'].split(' | ')) == count[tube['kingsbury']['station_id']], kingsbury
+    assert kingsbury['current_location'] == f"Near {tube['kingsbury']['station_id']}", kingsbury
+    wembley = result['wembleyLatestArrivals']
+    assert [len(d['arrival_times'].split(' | ')) for d in wembley] == [count[tube['wembley_park']['station_id']]], wembley
+
+    sections = {'490015769S': 'buses_to_wembley', '490000128B': 'buses_to_harrow', '490000128A': 'buses_to_hendon'}
+    for bus in SOURCES['bus']:
+        section = result[sections[bus['station_id']]]
+        assert sorted(section) == sorted(bus['lineId']), f"{sections[bus['station_id']]}: lines {sorted(section)}"
+        for line, times in section.items():
+            assert len(times.split(' | ')) == count[bus['station_id']], f"{sections[bus['station_id']]} {line}: {times}"
+    print(f"full refresh: {len(server.log)} requests for {len(count)} distinct stops, each section filtered to its own")
+
+
+def main():
+    failed = False
+    for check in (check_full_refresh,):
+        try:
+            check()
+        except AssertionError as e:
+            failed = True
+            print(f"{check.__name__[6:]}: FAILED {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,149 @@
+"""Check EPD.ReadBusy() on its edge-wait and polling paths.
+
+A stand-in pin backend holds BUSY low, or releases it after a set time,
+on the real clock, with or without the wait_busy_release() edge hook the
+Raspberry Pi backend has. The driver on the virtual backend then runs a
+full init and refresh against its BUSY model. Checks that:
+
+    - a panel that never releases BUSY raises BusyTimeoutError within
+      timeout_ms, on either path
+    - a panel that releases BUSY returns once it does, on either path,
+      with the polling path still re-sending 0x71 (get status) each time
+    - the virtual panel's modelled BUSY waits complete, and a stuck one
+      times out after exactly timeout_ms of its virtual clock
+
+    python benchmarks/check_busy.py
+"""
+import os
+import sys
+import threading
+import time
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'lib'))
+os.environ['EPD_BACKEND'] = 'virtual'
+
+from PIL import Image
+
+from waveshare_epd import epd7in5_V2, epdconfig
+
+TIMEOUT_MS = 300
+RELEASE_MS = 100
+SLACK_MS = 50       # scheduling jitter allowed on top of the expected wait
+
+
+class BusyPin:
+    """Pin backend whose BUSY line stays low until release(), optionally with an edge wait.
+
+    Args:
+        edge (bool): Provide wait_busy_release() like the Raspberry Pi backend.
+    """
+    RST_PIN, DC_PIN, CS_PIN, BUSY_PIN, PWR_PIN = 17, 25, 8, 24, 18
+
+    def __init__(self, edge):
+        self.commands = []
+        self._dc = 0
+        self._released = threading.Event()
+        if edge:
+            self.wait_busy_release = self._released.wait
+
+    def release(self):
+        self._released.set()
+
+    def digital_write(self, pin, value):
+        if pin == self.DC_PIN:
+            self._dc = value
+
+    def digital_read(self, pin):
+        return int(self._released.is_set()) if pin == self.BUSY_PIN else 0
+
+    def delay_ms(self, ms):
+        time.sleep(ms / 1000.0)
+
+    def spi_writebyte(self, data):
+        if not self._dc:
+            self.commands += data
+
+
+def read_busy(pin, release_after_ms=None):
+    """Run ReadBusy() against pin, returning (elapsed ms, the exception raised or None)."""
+    epd7in5_V2.epdconfig = pin
+    try:
+        epd = epd7in5_V2.EPD()
+        if release_after_ms is not None:
+            threading.Timer(release_after_ms / 1000.0, pin.release).start()
+        start = time.monotonic()
+        try:
+            epd.ReadBusy(timeout_ms=TIMEOUT_MS)
+            error = None
+        except epd7in5_V2.BusyTimeoutError as e:
+            error = e
+        return (time.monotonic() - start) * 1000, error
+    finally:
+        epd7in5_V2.epdconfig = epdconfig
+
+
+def check_timeout():
+    for edge in (True, False):
+        path = 'edge' if edge else 'poll'
+        pin = BusyPin(edge)
+        elapsed, error = read_busy(pin)
+        assert error is not None, f"{path}: no BusyTimeoutError on a pin held low"
+        # The 20 ms settle after a release is not reached on a timeout
+        limit = TIMEOUT_MS + (0 if edge else epd7in5_V2.BUSY_POLL_MS) + SLACK_MS
+        assert TIMEOUT_MS <= elapsed <= limit, f"{path}: timed out after {elapsed:.0f} ms, expected {TIMEOUT_MS}-{limit}"
+        print(f"timeout ({path}): BusyTimeoutError after {elapsed:.0f} ms of a {TIMEOUT_MS} ms timeout")
+
+
+def check_release():
+    for edge in (True, False):
+        path = 'edge' if edge else 'poll'
+        pin = BusyPin(edge)
+        elapsed, error = read_busy(pin, RELEASE_MS)
+        assert error is None, f"{path}: {error}"
+        # Released after RELEASE_MS, then the 20 ms settle
+        limit = RELEASE_MS + 20 + (0 if edge else epd7in5_V2.BUSY_POLL_MS) + SLACK_MS
+        assert RELEASE_MS <= elapsed <= limit, f"{path}: returned after {elapsed:.0f} ms, expected {RELEASE_MS}-{limit}"
+        sent = pin.commands.count(0x71)
+        if edge:
+            assert sent == 1, f"edge: 0x71 sent {sent} times"
+        else:
+            assert sent > RELEASE_MS // (epd7in5_V2.BUSY_POLL_MS * 2), f"poll: 0x71 sent only {sent} times"
+        print(f"release ({path}): returned {elapsed:.0f} ms after a {RELEASE_MS} ms wait, 0x71 sent {sent} times")
+
+
+def check_virtual():
+    panel = epdconfig.implementation
+    epd = epd7in5_V2.EPD()
+    epd.init()
+    epd.display(epd.getbuffer(Image.new('1', (epd.width, epd.height), 255)))
+    assert panel.stats['refreshes'] == {'full': 1}, panel.stats['refreshes']
+    assert panel.now_ms >= panel.busy_until, "virtual: returned while the refresh was still running"
+
+    # A refresh that never ends, on the virtual clock
+    panel.busy_until = float('inf')
+    before = panel.now_ms
+    try:
+        epd.ReadBusy(timeout_ms=TIMEOUT_MS)
+    except epd7in5_V2.BusyTimeoutError:
+        pass
+    else:
+        raise AssertionError("virtual: no BusyTimeoutError with BUSY held")
+    assert panel.now_ms - before == TIMEOUT_MS, f"virtual: waited {panel.now_ms - before:.0f} ms"
+    print(f"virtual: a full init and refresh waited out {panel.stats['busy_ms'] - TIMEOUT_MS:.0f} ms of modelled BUSY, "
+          f"a stuck one timed out at {TIMEOUT_MS} ms")
+
+
+def main():
+    failed = False
+    for check in (check_timeout, check_release, check_virtual):
+        try:
+            check()
+        except AssertionError as e:
+            failed = True
+            print(f"{check.__name__[6:]}: FAILED {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,196 @@
+"""Check the poll scheduler against a local stand-in server that enforces a rate limit.
+
+The server counts requests in fixed one-minute windows of a shared fake
+clock and answers 429, with or without Retry-After, once a window is full.
+The scheduler runs on the same clock, so minutes of polling take a second.
+Checks that:
+
+    - the token bucket keeps a full poll list under the server's limit,
+      with on-screen stops still polled on time
+    - a 429 with Retry-After pauses all polling for exactly that long
+    - a 429 without one backs off exponentially, and the backoff starts
+      over after a successful poll
+
+    python benchmarks/check_poll_scheduler.py
+"""
+import http.server
+import sys
+import threading
+from pathlib import Path
+
+import requests
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from poll_scheduler import PollScheduler
+
+
+class FakeClock:
+    def __init__(self, now=1000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+    def advance(self, seconds):
+        self.now += seconds
+
+
+class RateLimitedServer:
+    """Answers [] to any GET, or 429 once limit requests were made in the current minute.
+
+    Args:
+        clock (FakeClock): Clock the windows are counted on.
+        limit (int): Requests allowed per one-minute window.
+        retry_after (bool): Whether a 429 says when the window ends.
+    """
+
+    def __init__(self, clock, limit, retry_after=True):
+        self.clock = clock
+        self.limit = limit
+        self.retry_after = retry_after
+        self.log = []       # (time, path, status) of every request
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status, headers = server._admit(self.path)
+                body = b'[]' if status == 200 else b'{"message": "Too many requests"}'
+                self.send_response(status)
+                for name, value in headers.items():
+                    self.send_header(name, value)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def _admit(self, path):
+        now = self.clock()
+        window = now - now % 60
+        with self._lock:
+            used = sum(1 for when, _, status in self.log if when >= window and status == 200)
+            status = 200 if used < self.limit else 429
+            self.log.append((now, path, status))
+        headers = {}
+        if status == 429 and self.retry_after:
+            headers['Retry-After'] = str(int(window + 60 - now))
+        return status, headers
+
+    def statuses(self):
+        with self._lock:
+            return [status for _, _, status in self.log]
+
+    def close(self):
+        self._httpd.shutdown()
+
+
+session = requests.Session()
+
+
+def fetch(url):
+    response = session.get(url, timeout=5)
+    response.raise_for_status()
+    return response.json()
+
+
+def run_for(scheduler, clock, seconds, step=1.0):
+    for _ in range(int(seconds / step)):
+        scheduler.run_pending()
+        clock.advance(step)
+
+
+def check_budget():
+    clock = FakeClock()
+    # 20 a minute plus a burst of 10 never puts more than 30 in any minute
+    server = RateLimitedServer(clock, limit=30)
+    scheduler = PollScheduler(requests_per_minute=20, clock=clock)
+    on_screen = [f"screen{i}" for i in range(5)]
+    for key in on_screen:
+        scheduler.add(key, (fetch, f"{server.url}/{key}"), interval=60, on_screen=True)
+    for i in range(40):
+        scheduler.add(f"monitor{i}", (fetch, f"{server.url}/monitor{i}"), interval=60, on_screen=False)
+    run_for(scheduler, clock, 10 * 60)
+    server.close()
+
+    statuses = server.statuses()
+    assert 429 not in statuses, f"{statuses.count(429)} requests rejected within budget"
+    assert len(statuses) <= 20 * 10 + 10, f"{len(statuses)} requests in 10 minutes on a 20/min budget"
+    # Due together, the on-screen stops may each wait for a token, 3 s apart at 20 a minute
+    longest = 60 + len(on_screen) * 60 / 20
+    for key in on_screen:
+        times = [when for when, path, _ in server.log if path == f"/{key}"]
+        gaps = [later - earlier for earlier, later in zip(times, times[1:])]
+        assert len(times) >= 9 and max(gaps) <= longest, f"{key} polled {len(times)} times, up to {max(gaps):.0f}s apart"
+    print(f"budget: {len(statuses)} requests in 10 minutes, none rejected, on-screen stops polled about every minute")
+
+
+def check_retry_after():
+    clock = FakeClock(990.0)
+    server = RateLimitedServer(clock, limit=5)
+    scheduler = PollScheduler(requests_per_minute=50, clock=clock)
+    for i in range(10):
+        scheduler.add(f"stop{i}", (fetch, f"{server.url}/stop{i}"), interval=60)
+    scheduler.run_pending()
+    assert server.statuses() == [200] * 5 + [429], server.statuses()
+    # The window ends at 1020, 30 s after the 429
+    assert scheduler.paused_until == 1020.0, scheduler.paused_until
+
+    made = len(server.log)
+    clock.advance(29)
+    scheduler.run_pending()
+    assert len(server.log) == made, "polled while paused"
+    clock.advance(1)
+    scheduler.run_pending()
+    assert server.statuses()[made:] and 429 not in server.statuses()[made:], server.statuses()[made:]
+    server.close()
+    print(f"retry-after: paused {scheduler.paused_until - 990.0:.0f}s on a 429, resumed when the window reopened")
+
+
+def check_backoff():
+    clock = FakeClock()
+    server = RateLimitedServer(clock, limit=0, retry_after=False)
+    scheduler = PollScheduler(requests_per_minute=600, clock=clock)
+    scheduler.add('stop', (fetch, f"{server.url}/stop"), interval=60)
+
+    pauses = []
+    for _ in range(3):
+        clock.now = max(clock.now, scheduler.paused_until)
+        scheduler.run_pending()
+        pauses.append(scheduler.paused_until - clock.now)
+    assert pauses == [2, 4, 8], pauses
+
+    # A successful poll ends the run of 429s, so the next one starts from the shortest pause
+    server.limit = 1000
+    clock.now = scheduler.paused_until
+    scheduler.run_pending()
+    assert server.statuses()[-1] == 200 and scheduler.throttled == 0, (server.statuses(), scheduler.throttled)
+    server.limit = 0
+    clock.advance(60)
+    scheduler.run_pending()
+    assert scheduler.paused_until - clock.now == 2, scheduler.paused_until - clock.now
+    server.close()
+    print(f"backoff: paused {', '.join(f'{p:.0f}s' for p in pauses)} on successive 429s, 2s again after a success")
+
+
+def main():
+    failed = False
+    for check in (check_budget, check_retry_after, check_backoff):
+        try:
+            check()
+        except AssertionError as e:
+            failed = True
+            print(f"{check.__name__[6:]}: FAILED {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
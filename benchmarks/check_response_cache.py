@@ -0,0 +1,154 @@
+"""Check the response cache on the live fetch path against a local stand-in server.
+
+The server answers every arrivals request with a small payload, a
+Cache-Control max-age and an ETag, and answers 304 to a request that
+sends the ETag back. Checks that:
+
+    - a second fetch_arrivals() within max-age is served from the cache
+      without a request
+    - once the entry is older than max-age, the fetch revalidates it with
+      the ETag and decodes the cached body from the 304
+    - an ArrivalsBatch passes each stop's own max_age to its fetch, and the
+      cycle's metrics count the hits and revalidations
+    - a body the disk tier cannot write leaves no temporary file behind
+
+    python benchmarks/check_response_cache.py
+"""
+import http.server
+import json
+import os
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+import metrics
+import tfl
+from response_cache import ResponseCache
+
+ETAG = '"arrivals-1"'
+MAX_AGE = 60
+PAYLOAD = [
+    {'platformName': 'Southbound - Platform 2', 'lineId': 'jubilee', 'destinationName': 'Stratford',
+     'timeToStation': 120, 'expectedArrival': '2026-10-18T12:02:00Z', 'vehicleId': '201',
+     'currentLocation': 'At Neasden'},
+]
+
+
+class CachingServer:
+    """Answers any GET with PAYLOAD, or 304 when the request carries its ETag."""
+
+    def __init__(self):
+        self.log = []       # (path, status) of every request
+        self._lock = threading.Lock()
+        server = self
+
+        class Handler(http.server.BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                status = 304 if self.headers.get('If-None-Match') == ETAG else 200
+                with server._lock:
+                    server.log.append((self.path, status))
+                body = json.dumps(PAYLOAD).encode() if status == 200 else b''
+                self.send_response(status)
+                self.send_header('Cache-Control', f'max-age={MAX_AGE}')
+                self.send_header('ETag', ETAG)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):
+                pass
+
+        self._httpd = http.server.ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.url = f"http://127.0.0.1:{self._httpd.server_port}"
+        threading.Thread(target=self._httpd.serve_forever, daemon=True).start()
+
+    def statuses(self):
+        with self._lock:
+            return [status for _, status in self.log]
+
+    def close(self):
+        self._httpd.shutdown()
+
+
+def check_fresh():
+    server = CachingServer()
+    url = f"{server.url}/StopPoint/940GZZLUKBY/Arrivals"
+    before = tfl.get_cache_stats()
+    first = tfl.fetch_arrivals(url)
+    second = tfl.fetch_arrivals(url)
+    stats = tfl.get_cache_stats()
+    server.close()
+
+    assert server.statuses() == [200], f"{len(server.log)} requests for two fetches within max-age"
+    assert first == second and len(first) == 1, (first, second)
+    assert (stats['hits'] - before['hits'], stats['misses'] - before['misses']) == (1, 1), stats
+    print("fresh: the second fetch within max-age was served from the cache, 1 request for 2 fetches")
+
+
+def check_revalidate():
+    server = CachingServer()
+    url = f"{server.url}/StopPoint/940GZZLUWYP/Arrivals"
+    first = tfl.fetch_arrivals(url)
+    # Age the entry past max-age rather than waiting a minute
+    entry = tfl.response_cache.get(url)
+    assert entry is not None, "the first fetch was not cached"
+    entry.stored_at -= MAX_AGE + 1
+    entry.expires_at -= MAX_AGE + 1
+    before = tfl.get_cache_stats()
+    second = tfl.fetch_arrivals(url)
+    stats = tfl.get_cache_stats()
+    server.close()
+
+    assert server.statuses() == [200, 304], server.statuses()
+    assert first == second and len(first) == 1, (first, second)
+    assert stats['revalidated'] - before['revalidated'] == 1, stats
+    assert tfl.response_cache.get(url).is_fresh(), "the 304 did not extend the entry"
+    print("revalidate: the stale entry was revalidated with its ETag and served from the cache on a 304")
+
+
+def check_batch_max_age():
+    server = CachingServer()
+    tfl.API_BASE = server.url
+    batch = tfl.ArrivalsBatch()
+    # The server's max-age covers the shared stop; the other asks for a poll every time
+    batch.add_station('940GZZLUSTM', 'Southbound - Platform 2')
+    batch.add_lines('490000077E', ['183', 'sl10'], max_age=0)
+    metrics.finish_cycle(None, None)
+    batch.execute()
+    batch.execute()
+    counters = metrics.finish_cycle(None, None)['counters']
+    server.close()
+
+    requests_made = {path: [status for logged, status in server.log if logged == path] for path, _ in server.log}
+    assert requests_made == {'/StopPoint/940GZZLUSTM/Arrivals': [200], '/Line/183,sl10/Arrivals/490000077E': [200, 304]}, requests_made
+    assert counters.get('cache_hits') == 1 and counters.get('cache_revalidated') == 1, counters
+    print("batch max_age: the stop without one was served from the cache, the max_age=0 stop was revalidated")
+
+
+def check_unwritable_body():
+    with tempfile.TemporaryDirectory() as cache_dir:
+        cache = ResponseCache(cache_dir=cache_dir)
+        cache.store('http://example.invalid/a', b'\xff not utf-8', {'ETag': '"a"'})
+        left = os.listdir(cache_dir)
+    assert left == [], f"{left} left in the cache directory"
+    print("unwritable body: the disk tier skipped it and removed its temporary file")
+
+
+def main():
+    failed = False
+    for check in (check_fresh, check_revalidate, check_batch_max_age, check_unwritable_body):
+        try:
+            check()
+        except AssertionError as e:
+            failed = True
+            print(f"{check.__name__[6:]}: FAILED {e}")
+    return 1 if failed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
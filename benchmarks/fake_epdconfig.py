@@ -0,0 +1,34 @@
+"""A do-nothing epdconfig so the panel driver imports off the Pi.
+
+Shared by the benchmarks. Every byte the driver would clock out over SPI
+is appended to the list install_fake_epdconfig() returns.
+"""
+import sys
+import types
+from pathlib import Path
+
+sys.path.append(str(Path(__file__).resolve().parent.parent / 'lib'))
+
+
+def _spi_bytes(data):
+    # spidev masks each int to a byte; bytes-like data goes out unchanged
+    if isinstance(data, (bytes, bytearray, memoryview)):
+        return bytes(data)
+    return bytes(d & 0xFF for d in data)
+
+
+def install_fake_epdconfig():
+    """Register a do-nothing epdconfig so epd7in5_V2 imports off the Pi."""
+    sent = []
+    fake = types.ModuleType('waveshare_epd.epdconfig')
+    fake.RST_PIN, fake.DC_PIN, fake.CS_PIN, fake.BUSY_PIN, fake.PWR_PIN = 17, 25, 8, 24, 18
+    fake.digital_write = lambda pin, value: None
+    fake.digital_read = lambda pin: 1
+    fake.delay_ms = lambda ms: None
+    fake.spi_writebyte = lambda data: sent.append(bytes(data))
+    fake.spi_writebyte2 = lambda data: sent.append(bytes(data))
+    fake.SPI = types.SimpleNamespace(writebytes2=lambda data: sent.append(_spi_bytes(data)))
+    fake.module_init = lambda *args: 0
+    fake.module_exit = lambda *args: None
+    sys.modules['waveshare_epd.epdconfig'] = fake
+    return sent
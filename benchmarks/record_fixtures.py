@@ -0,0 +1,33 @@
+"""Re-record the TfL arrivals fixtures used by bench_suite.py.
+
+Busy stops are busiest at rush hour, so record then for a realistic hub.
+
+    python benchmarks/record_fixtures.py
+"""
+import json
+from pathlib import Path
+
+import requests
+
+FIXTURES = Path(__file__).resolve().parent / 'fixtures'
+
+STOPS = {
+    'quiet_stop': '940GZZLUKBY',    # Kingsbury, Jubilee only
+    'bus_stop': '490000128B',       # Kingsbury Station, stop B
+    'busy_hub': '940GZZLUWYP',      # Wembley Park, Metropolitan and Jubilee
+}
+
+
+def main():
+    FIXTURES.mkdir(exist_ok=True)
+    for name, station_id in STOPS.items():
+        response = requests.get(f"https://api.tfl.gov.uk/StopPoint/{station_id}/Arrivals", timeout=10)
+        response.raise_for_status()
+        payload = response.json()
+        with open(FIXTURES / f"{name}.json", 'w') as file:
+            json.dump(payload, file, separators=(',', ':'))
+        print(f"{name}: {len(payload)} predictions")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,108 @@
+"""When to refresh next, from the arrivals on screen and the service hours.
+
+The board shows clock times, so what it shows only changes when a train
+turns "Due" or leaves. The daemon sleeps until the next of those moments,
+kept between a minimum and a maximum interval: every minute or so while
+a train is a few minutes away, up to the maximum when headways are long.
+Outside service hours there is nothing to show, so polling and panel
+refreshes stop until service resumes, and the footer says when that is.
+"""
+import time
+from datetime import datetime, timedelta
+
+from predictions import DUE_GRACE
+from tfl import DUE_WITHIN
+
+MIN_INTERVAL = 60           # seconds, the shortest gap between refreshes
+MAX_INTERVAL = 5 * 60       # seconds, the longest gap during service
+
+
+def next_change(arrivals, now):
+    """Epoch seconds when one of arrivals next changes on screen, or None."""
+    moments = (
+        moment
+        for arrival in arrivals
+        for moment in (arrival.expected - DUE_WITHIN, arrival.expected + DUE_GRACE)
+        if moment > now
+    )
+    return min(moments, default=None)
+
+
+def parse_clock(value):
+    """(hours, minutes) of an 'HH:MM' local time."""
+    hours, _, minutes = value.partition(':')
+    return int(hours), int(minutes or 0)
+
+
+class ServiceHours:
+    """The daily window the board is useful in, in local time.
+
+    Args:
+        start (str): 'HH:MM' the first service starts.
+        end (str): 'HH:MM' the last service ends; earlier than start means
+            the next morning.
+        all_night (iterable): Weekday names, e.g. 'Friday', whose service
+            runs through the night to the next day's start.
+    """
+
+    def __init__(self, start, end, all_night=()):
+        self.start = parse_clock(start)
+        self.end = parse_clock(end)
+        self.all_night = set(all_night)
+
+    @classmethod
+    def from_config(cls, config):
+        """ServiceHours from a sources.json entry, or None to always be in service."""
+        if not config:
+            return None
+        return cls(config['start'], config['end'], config.get('all_night', ()))
+
+    def _window(self, day):
+        start = datetime.combine(day, datetime.min.time()).replace(hour=self.start[0], minute=self.start[1])
+        if day.strftime('%A') in self.all_night:
+            return start, start + timedelta(days=1)
+        end = start.replace(hour=self.end[0], minute=self.end[1])
+        if end <= start:
+            end += timedelta(days=1)
+        return start, end
+
+    def in_service(self, now=None):
+        now = time.time() if now is None else now
+        local = datetime.fromtimestamp(now)
+        for day in (local.date() - timedelta(days=1), local.date()):
+            start, end = self._window(day)
+            if start <= local < end:
+                return True
+        return False
+
+    def next_start(self, now=None):
+        """Epoch seconds of the next time service is running, now if it already is."""
+        now = time.time() if now is None else now
+        if self.in_service(now):
+            return now
+        local = datetime.fromtimestamp(now)
+        starts = (self._window(local.date() + timedelta(days=offset))[0] for offset in (0, 1))
+        return min(start for start in starts if start > local).timestamp()
+
+
+def next_refresh(arrivals, now, hours=None, max_interval=MAX_INTERVAL, min_interval=MIN_INTERVAL):
+    """Epoch seconds the screen should next be refreshed.
+
+    Args:
+        arrivals (list): The arrivals on screen, as of now.
+        now (float): Epoch seconds.
+        hours (ServiceHours): Service hours, or None for always.
+        max_interval (float): Longest gap between refreshes during service.
+        min_interval (float): Shortest gap; None for a fixed max_interval.
+
+    Returns:
+        float: The next refresh time, at the next service start when the
+        board would otherwise wake outside service hours.
+    """
+    wake = now + max_interval
+    change = next_change(arrivals, now) if min_interval is not None else None
+    if change is not None:
+        wake = min(wake, max(change, now + min_interval))
+    if hours is not None:
+        wake = hours.next_start(wake)
+    return wake
@@ -0,0 +1,80 @@
+"""Find the parts of a 1-bpp frame that changed since the last one shown.
+
+Frames are the packed buffers produced by EPD.getbuffer(): one bit per
+pixel, rows of width // 8 bytes. Regions are (x0, y0, x1, y1) with the end
+coordinates exclusive and x aligned to the 8-pixel byte boundary the
+controller's partial window requires.
+"""
+
+DEFAULT_WIDTH, DEFAULT_HEIGHT = 800, 480
+MERGE_GAP = 16      # rows between two changed bands before they become separate windows
+MAX_REGIONS = 3     # beyond this, one bounding window is cheaper than several refreshes
+
+
+def _changed_span(old_row, new_row):
+    """Return the first and last differing byte index of two equal-length rows."""
+    diff = int.from_bytes(old_row, 'big') ^ int.from_bytes(new_row, 'big')
+    last_byte = len(old_row) - 1
+    first = last_byte - (diff.bit_length() - 1) // 8
+    last = last_byte - ((diff & -diff).bit_length() - 1) // 8
+    return first, last
+
+
+def dirty_regions(old, new, width=DEFAULT_WIDTH, height=DEFAULT_HEIGHT, merge_gap=MERGE_GAP, max_regions=MAX_REGIONS):
+    """Return byte-aligned boxes covering every pixel that differs between old and new.
+
+    Args:
+        old: The frame currently on the panel, or None if unknown.
+        new: The frame about to be shown.
+        width (int): Frame width in pixels, a multiple of 8.
+        height (int): Frame height in pixels.
+        merge_gap (int): Changed bands closer than this many rows share a box.
+        max_regions (int): Collapse to one bounding box above this many boxes.
+
+    Returns:
+        list: (x0, y0, x1, y1) tuples, empty when nothing changed.
+    """
+    if old is None:
+        return [(0, 0, width, height)]
+    if old == new:
+        return []
+
+    stride = width // 8
+    old_view, new_view = memoryview(old), memoryview(new)
+    bands = []
+    for y in range(height):
+        start = y * stride
+        old_row, new_row = old_view[start:start + stride], new_view[start:start + stride]
+        if old_row == new_row:
+            continue
+        first, last = _changed_span(old_row, new_row)
+        if bands and y - bands[-1][1] <= merge_gap:
+            band = bands[-1]
+            band[1] = y
+            band[2] = min(band[2], first)
+            band[3] = max(band[3], last)
+        else:
+            bands.append([y, y, first, last])
+
+    regions = [(first * 8, y0, (last + 1) * 8, y1 + 1) for y0, y1, first, last in bands]
+    if len(regions) > max_regions:
+        regions = [bounding_box(regions)]
+    return regions
+
+
+def bounding_box(regions):
+    """Return the smallest box containing all of regions."""
+    return (
+        min(r[0] for r in regions),
+        min(r[1] for r in regions),
+        max(r[2] for r in regions),
+        max(r[3] for r in regions),
+    )
+
+
+
+def changed_pixels(old, new):
+    """Number of pixels that differ between two frames of the same size."""
+    if old == new:
+        return 0
+    return (int.from_bytes(old, 'big') ^ int.from_bytes(new, 'big')).bit_count()
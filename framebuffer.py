@@ -0,0 +1,175 @@
+"""The last frame sent to the panel, kept as raw 1-bpp bytes in a mapped file.
+
+The file is a small header followed by two frame slots:
+
+    header  magic, version, width, height, active slot, refresh count,
+            sequence, last full refresh, last update, CRC of the active slot,
+            pixels changed by partial refreshes since the last full one
+    slot 0  width * height / 8 bytes, PIL "1" layout (a set bit is white)
+    slot 1  the same
+
+The active slot is the previous frame and the diff base for the next
+refresh. commit() writes a new frame into the other slot, rewriting only
+the rows that differ from it, flushes, and then flips the active slot in
+the header. A crash before the flip leaves the old frame in place, and a
+slot whose CRC does not match is treated as missing, which forces a full
+refresh. The refresh counter lives in the same header, so a tick updates
+one small file in place instead of encoding a PNG and a text file. The
+counters since the last full refresh feed the refresh policy.
+"""
+import mmap
+import os
+import struct
+import time
+import zlib
+
+FRAME_STORE_PATH = os.environ.get('FRAME_STORE', 'frame.bin')
+
+MAGIC = b'LTTF'
+VERSION = 2
+HEADER = struct.Struct('<4sHHHBxIIddII')
+HEADER_SIZE = 64
+
+PANEL_SIZE = (800, 480)
+
+
+class FrameStore:
+    """Memory-mapped previous frame and refresh counter.
+
+    Args:
+        path (str): File holding the header and both frame slots.
+        width (int): Frame width in pixels, a multiple of 8.
+        height (int): Frame height in pixels.
+    """
+
+    def __init__(self, path, width, height):
+        self.path = path
+        self.width = width
+        self.height = height
+        self.stride = width // 8
+        self.frame_bytes = self.stride * height
+        self.size = HEADER_SIZE + 2 * self.frame_bytes
+        self._file = self._open()
+        self._map = mmap.mmap(self._file.fileno(), self.size)
+        if not self._header_valid():
+            self._reset()
+
+    def _open(self):
+        try:
+            file = open(self.path, 'r+b')
+        except FileNotFoundError:
+            file = open(self.path, 'w+b')
+        if os.fstat(file.fileno()).st_size != self.size:
+            file.truncate(self.size)
+        return file
+
+    def _header(self):
+        return HEADER.unpack_from(self._map, 0)
+
+    def _header_valid(self):
+        magic, version, width, height, active = self._header()[:5]
+        return magic == MAGIC and version == VERSION and (width, height) == (self.width, self.height) and active in (0, 1)
+
+    def _write_header(self, active, refresh_count, sequence, full_at, updated_at, crc, changed):
+        HEADER.pack_into(self._map, 0, MAGIC, VERSION, self.width, self.height,
+                         active, refresh_count, sequence, full_at, updated_at, crc, changed)
+        self._map.flush(0, mmap.PAGESIZE)
+
+    def _reset(self):
+        self._map[:] = bytes(self.size)
+        self._write_header(0, 0, 0, 0.0, 0.0, 0, 0)
+
+    def _slot(self, index):
+        start = HEADER_SIZE + index * self.frame_bytes
+        return start, start + self.frame_bytes
+
+    @property
+    def refresh_count(self):
+        """Partial refreshes since the last full one."""
+        return self._header()[5]
+
+    @refresh_count.setter
+    def refresh_count(self, count):
+        header = list(self._header()[4:])
+        header[1] = count
+        self._write_header(*header)
+
+    @property
+    def sequence(self):
+        """Frames committed since the store was created; 0 when it holds none."""
+        return self._header()[6]
+
+    @property
+    def last_full_refresh(self):
+        """Epoch seconds of the last full refresh, 0.0 when unknown."""
+        return self._header()[7]
+
+    @property
+    def updated(self):
+        return self._header()[8]
+
+    @property
+    def changed_pixels(self):
+        """Pixels changed by partial refreshes since the last full one."""
+        return self._header()[10]
+
+    def frame(self):
+        """The active frame as bytes, or None when there is no intact frame."""
+        active, _, sequence, _, _, crc, _ = self._header()[4:]
+        if sequence == 0:
+            return None
+        start, end = self._slot(active)
+        frame = self._map[start:end]
+        return frame if zlib.crc32(frame) == crc else None
+
+    def image(self):
+        """The active frame as a PIL "1" image, or None."""
+        frame = self.frame()
+        if frame is None:
+            return None
+        from PIL import Image
+        return Image.frombytes('1', (self.width, self.height), frame)
+
+    def commit(self, frame, full=False, changed=0):
+        """Make frame the active frame.
+
+        Args:
+            frame (bytes): A PIL "1" frame, e.g. image.tobytes().
+            full (bool): Whether the panel just had a full refresh, which resets the counters.
+            changed (int): Pixels a partial refresh changed; 0 when nothing was sent.
+        """
+        if len(frame) != self.frame_bytes:
+            raise ValueError(f"frame is {len(frame)} bytes, expected {self.frame_bytes}")
+        active, count, sequence, full_at, _, _, total_changed = self._header()[4:]
+        target = 1 - active
+        start, _ = self._slot(target)
+        view = memoryview(frame)
+        # Only rows that differ are written, so unchanged pages stay clean
+        for row in range(start, start + self.frame_bytes, self.stride):
+            offset = row - start
+            line = view[offset:offset + self.stride]
+            if self._map[row:row + self.stride] != line:
+                self._map[row:row + self.stride] = line
+        self._map.flush(start - start % mmap.PAGESIZE, self.frame_bytes + start % mmap.PAGESIZE)
+
+        now = time.time()
+        if full:
+            count, full_at, total_changed = 0, now, 0
+        elif changed:
+            count, total_changed = count + 1, total_changed + changed
+        self._write_header(target, count, sequence + 1, full_at, now, zlib.crc32(frame), total_changed)
+
+    def close(self):
+        self._map.close()
+        self._file.close()
+
+
+_stores = {}
+
+
+def get_frame_store(size=PANEL_SIZE, path=FRAME_STORE_PATH):
+    """The shared FrameStore for path, opened on first use."""
+    store = _stores.get(path)
+    if store is None or (store.width, store.height) != tuple(size):
+        store = _stores[path] = FrameStore(path, *size)
+    return store
@@ -0,0 +1,69 @@
+"""Incremental decoding of a top-level JSON array.
+
+iter_array() yields one item at a time while the body is still arriving,
+so a caller that filters the items only ever holds the current item and
+the ones it keeps, never the whole decoded document.
+"""
+import codecs
+import json
+
+_decoder = json.JSONDecoder()
+_SEPARATORS = ' \t\r\n,'
+
+
+def iter_array(chunks):
+    """Yield the items of a JSON array read from an iterable of byte chunks.
+
+    The chunks are read to the end even after the array closes, so a
+    generator behind them, such as one caching the body, runs to completion.
+
+    Raises:
+        ValueError: The body is not a JSON array or ends before the array closes.
+    """
+    chunks = iter(chunks)
+    text = codecs.getincrementaldecoder('utf-8')()
+    buf = ''
+    pos = 0
+    started = False
+    for chunk in chunks:
+        buf = buf[pos:] + text.decode(chunk)
+        pos = 0
+        if not started:
+            pos = _skip(buf, pos, ' \t\r\n')
+            if pos == len(buf):
+                continue
+            if buf[pos] != '[':
+                raise ValueError("expected a JSON array")
+            started = True
+            pos += 1
+        while True:
+            pos = _skip(buf, pos, _SEPARATORS)
+            if pos == len(buf):
+                break
+            if buf[pos] == ']':
+                for _ in chunks:
+                    pass
+                return
+            try:
+                item, end = _decoder.raw_decode(buf, pos)
+            except ValueError:
+                break  # item continues in the next chunk
+            if not isinstance(item, (dict, list, str)) and (end == len(buf) or buf[end] not in _SEPARATORS + ']'):
+                break  # a number may be cut short, e.g. "3." of "3.5"
+            yield item
+            pos = end
+    raise ValueError("JSON array ended early")
+
+
+def iter_bytes(body, size=16384):
+    """Split an in-memory body into chunks for iter_array()."""
+    view = memoryview(body)
+    for start in range(0, len(view), size):
+        yield view[start:start + size]
+
+
+def _skip(buf, pos, chars):
+    end = len(buf)
+    while pos < end and buf[pos] in chars:
+        pos += 1
+    return pos
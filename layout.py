@@ -0,0 +1,157 @@
+"""Compile the declarative screen layout into a table of regions.
+
+layout.json describes the screen as sections of fields. Sections flow
+down the panel: an optional title, one row per field, then a divider.
+Fields may pin "x"/"y", sit "inline" on the previous row, or be
+right-aligned. Compiling measures every label with the real fonts and
+produces one Region per static text and per dynamic value. Each region
+has a box widened to the 8-pixel byte boundary of the panel's partial
+window, so a value can be redrawn and refreshed in place.
+"""
+import json
+from typing import NamedTuple, Optional
+
+from PIL import ImageDraw
+
+
+class Region(NamedTuple):
+    name: str
+    dynamic: bool
+    box: tuple           # (x0, y0, x1, y1), x on byte boundaries, ends exclusive
+    origin: tuple        # where the text is drawn (its right edge when align is "right")
+    font: str
+    align: str = 'left'
+    text: Optional[str] = None  # static text; None for dynamic values
+    label: Optional[str] = None  # drawn again ahead of a dynamic value, from origin
+
+
+class Layout(NamedTuple):
+    size: tuple
+    font_sizes: dict
+    regions: dict        # name -> Region, in drawing order
+    dividers: tuple      # ((x0, y0, x1, y1), width)
+
+    @property
+    def static_text(self):
+        """(position, text, font) of every static region, as the template draws them."""
+        return tuple((r.origin, r.text, r.font) for r in self.regions.values() if not r.dynamic)
+
+    def dynamic_regions(self):
+        return [r for r in self.regions.values() if r.dynamic]
+
+
+def load_layout_spec(path):
+    with open(path, 'r') as file:
+        return json.load(file)
+
+
+def align_box(x0, y0, x1, y1, width):
+    """Widen a box to whole bytes of the 1-bpp frame."""
+    return (max(0, x0 // 8 * 8), y0, min(width, (x1 + 7) // 8 * 8), y1)
+
+
+def compile_layout(spec, fonts):
+    """Compile a layout spec into a Layout, measuring text with fonts.
+
+    Args:
+        spec (dict): The parsed layout.json.
+        fonts (dict): Font name -> loaded ImageFont, covering spec['fonts'].
+
+    Returns:
+        Layout: The region table shared by the renderer and the partial refresh.
+    """
+    width, height = spec['size']
+    margin = spec.get('margin', 10)
+    title_font = spec.get('title_font', 'medium')
+    field_font = spec.get('field_font', 'small')
+    row_height = spec.get('row_height', 25)
+
+    regions = {}
+    dividers = []
+    cursor = 0
+
+    def line_height(font_name):
+        ascent, descent = fonts[font_name].getmetrics()
+        return ascent + descent
+
+    def add_static(name, x, y, text, font_name):
+        box = align_box(x, y, x + int(fonts[font_name].getlength(text)), y + line_height(font_name), width)
+        regions[name] = Region(name, False, box, (x, y), font_name, text=text)
+
+    for index, section in enumerate(spec['sections']):
+        y = section.get('top', cursor + section.get('gap', spec.get('section_gap', 10)))
+        if section.get('title'):
+            add_static(f"section{index}.title", margin, y, section['title'], section.get('title_font', title_font))
+            y += section.get('title_height', spec.get('title_height', 35))
+
+        rows = []
+        row_y = y
+        for field in section.get('fields', []):
+            if not field.get('inline') or not rows:
+                rows.append([])
+            if not field.get('inline'):
+                row_y = y
+                y += row_height
+            rows[-1].append((field, field.get('y', row_y)))
+
+        for row in rows:
+            row.sort(key=lambda item: item[0].get('x', margin))
+            for position, (field, fy) in enumerate(row):
+                font_name = field.get('font', field_font)
+                name = field['id']
+                if field.get('align') == 'right':
+                    right = field.get('x', width - margin)
+                    box = align_box(right - field.get('width', width // 2), fy, right, fy + line_height(font_name), width)
+                    regions[name] = Region(name, True, box, (right, fy), font_name, 'right')
+                    continue
+                fx = field.get('x', margin)
+                origin = (fx, fy)
+                label = field.get('label')
+                if label:
+                    add_static(f"{name}.label", fx, fy, label, font_name)
+                    # Hinted advances are rounded per run, so a value drawn on its own after
+                    # the label may land a pixel off; the box starts a pixel early to hold it
+                    fx += int(fonts[font_name].getlength(label)) - 1
+                # A value runs to the next field on its row, or its own width, or the panel edge
+                right = row[position + 1][0].get('x', margin) if position + 1 < len(row) else width
+                if 'width' in field:
+                    right = min(right, fx + field['width'])
+                box = align_box(fx, fy, right, fy + line_height(font_name), width)
+                regions[name] = Region(name, True, box, origin, font_name, label=label)
+
+        divider = section.get('divider', {})
+        if divider is not None:
+            dy = divider.get('y', y)
+            dividers.append(((0, dy, width, dy), divider.get('width', 1)))
+            y = dy
+        cursor = y
+
+    return Layout((width, height), dict(spec['fonts']), regions, tuple(dividers))
+
+
+def draw_fields(image, template, layout, values, fonts, color=0):
+    """Redraw dynamic fields of image in place.
+
+    Each named region is first restored from the static template, then its
+    value drawn, so a field can be updated on a previous frame without
+    touching anything outside its box. A labelled value is drawn in one
+    run with its label, which redraws the label's pixels unchanged, so the
+    value is placed exactly as "label + value" would be.
+
+    Returns:
+        list: The boxes that were redrawn.
+    """
+    draw = ImageDraw.Draw(image)
+    boxes = []
+    for name, value in values.items():
+        region = layout.regions[name]
+        image.paste(template.crop(region.box), region.box[:2])
+        x, y = region.origin
+        text = str(value) if region.label is None else region.label + str(value)
+        if region.align == 'right':
+            # Aligned by the inked width, as the date always was
+            left, _, right, _ = draw.textbbox((0, 0), text, font=fonts[region.font])
+            x -= right - left
+        draw.text((x, y), text, font=fonts[region.font], fill=color)
+        boxes.append(region.box)
+    return boxes
@@ -29,6 +29,7 @@
 
 
 import logging
+import time
 from . import epdconfig
 
 # Display resolution
@@ -40,8 +41,93 @@ GRAY2  = 0xC0
 GRAY3  = 0x80 #gray
 GRAY4  = 0x00 #Blackest
 
+# One frame plane is 1 bit per pixel
+FRAME_BYTES = EPD_WIDTH * EPD_HEIGHT // 8
+
+# Constant planes used by Clear(), built once at import
+_BLANK_OLD = b'\xff' * FRAME_BYTES
+_BLANK_NEW = bytes(FRAME_BYTES)
+
+# How long ReadBusy() waits for the panel before giving up, and how often it polls
+# when the backend has no edge wait
+BUSY_TIMEOUT_MS = 30000
+BUSY_POLL_MS    = 10
+
+# bytes.translate table flipping every bit of a byte (same result as ~x & 0xFF)
+_INVERT = bytes(range(0xFF, -1, -1))
+
+# 4-gray: Image.point table taking an 8-bit gray to its 2-bit level, remapping
+# GRAY2 (0xC0) and GRAY3 (0x80) to the codes the waveform expects
+_GRAY_LEVELS = [((0x80 if v == 0xC0 else 0x40 if v == 0x80 else v) & 0xC0) >> 6 for v in range(256)]
+
+def _gray_nibbles(old_bits, shift):
+    # bytes.translate table: a byte of four 2-bit pixels -> one plane bit per pixel,
+    # packed into a nibble and shifted into place
+    table = bytearray(256)
+    for b in range(256):
+        nibble = 0
+        for k in range(4):
+            nibble = (nibble << 1) | old_bits[(b >> (6 - 2 * k)) & 3]
+        table[b] = nibble << shift
+    return bytes(table)
+
+# Plane bit for each 2-bit code 0x00, 0x40, 0x80, 0xC0
+_GRAY_OLD = (1, 0, 1, 0)
+_GRAY_NEW = (1, 1, 0, 0)
+_GRAY_OLD_HI, _GRAY_OLD_LO = _gray_nibbles(_GRAY_OLD, 4), _gray_nibbles(_GRAY_OLD, 0)
+_GRAY_NEW_HI, _GRAY_NEW_LO = _gray_nibbles(_GRAY_NEW, 4), _gray_nibbles(_GRAY_NEW, 0)
+
+# Controller sequences as (command, data) steps replayed by EPD._replay().
+# WAIT_BUSY waits for the electronic paper IC to release the idle signal after POWER ON.
+WAIT_BUSY = None
+
+INIT_SEQUENCE = (
+    (0x06, (0x17, 0x17, 0x28, 0x17)),   # btst; if an exception is displayed, try 0x38 as the third byte
+    (0x01, (0x07, 0x07, 0x28, 0x17)),   # POWER SETTING: VGH=20V,VGL=-20V, VDH=15V, VDL=-15V
+    (0x04, ()),                         # POWER ON
+    WAIT_BUSY,
+    (0x00, (0x1F,)),                    # PANNEL SETTING: KW-3f KWR-2F BWROTP 0f BWOTP 1f
+    (0x61, (0x03, 0x20, 0x01, 0xE0)),   # tres: source 800, gate 480
+    (0x15, (0x00,)),
+    # If the screen appears gray, use 0x50 (0x10, 0x17) followed by 0x52 (0x03)
+    (0x50, (0x10, 0x07)),
+    (0x60, (0x22,)),                    # TCON SETTING
+)
+
+INIT_FAST_SEQUENCE = (
+    (0x00, (0x1F,)),                    # PANNEL SETTING: KW-3f KWR-2F BWROTP 0f BWOTP 1f
+    # If the screen appears gray, use 0x50 (0x10, 0x17) followed by 0x52 (0x03)
+    (0x50, (0x10, 0x07)),
+    (0x04, ()),                         # POWER ON
+    WAIT_BUSY,
+    (0x06, (0x27, 0x27, 0x18, 0x17)),   # Enhanced display drive: Booster Soft Start
+    (0xE0, (0x02,)),
+    (0xE5, (0x5A,)),
+)
+
+INIT_PART_SEQUENCE = (
+    (0x00, (0x1F,)),                    # PANNEL SETTING: KW-3f KWR-2F BWROTP 0f BWOTP 1f
+    (0x04, ()),                         # POWER ON
+    WAIT_BUSY,
+    (0xE0, (0x02,)),
+    (0xE5, (0x6E,)),
+)
+
+INIT_4GRAY_SEQUENCE = (
+    (0x00, (0x1F,)),                    # PANNEL SETTING: KW-3f KWR-2F BWROTP 0f BWOTP 1f
+    (0x50, (0x10, 0x07)),
+    (0x04, ()),                         # POWER ON
+    WAIT_BUSY,
+    (0x06, (0x27, 0x27, 0x18, 0x17)),   # Enhanced display drive: Booster Soft Start
+    (0xE0, (0x02,)),
+    (0xE5, (0x5F,)),
+)
+
 logger = logging.getLogger(__name__)
 
+class BusyTimeoutError(RuntimeError):
+    """The panel held BUSY low for longer than the allowed time."""
+
 class EPD:
     def __init__(self):
         self.reset_pin = epdconfig.RST_PIN
@@ -54,6 +140,8 @@ class EPD:
         self.GRAY2  = GRAY2
         self.GRAY3  = GRAY3 #gray
         self.GRAY4  = GRAY4 #Blackest
+        self.busy_ms = 0.0        # duration of the last BUSY wait
+        self.busy_total_ms = 0.0  # all BUSY waits since the EPD was created
     
     # Hardware reset
     def reset(self):
@@ -76,163 +164,82 @@ class EPD:
         epdconfig.spi_writebyte([data])
         epdconfig.digital_write(self.cs_pin, 1)
 
+    # Command byte and its parameters in two SPI writes, the command with DC low and the
+    # whole payload with DC high, instead of one write per parameter byte. spidev frames
+    # each write with its own hardware CS pulse; the CS writes here are no-ops on the Pi.
+    def send_command_data(self, command, data=()):
+        epdconfig.digital_write(self.dc_pin, 0)
+        epdconfig.digital_write(self.cs_pin, 0)
+        epdconfig.spi_writebyte([command])
+        if data:
+            epdconfig.digital_write(self.dc_pin, 1)
+            epdconfig.spi_writebyte2(list(data))
+        epdconfig.digital_write(self.cs_pin, 1)
+
     def send_data2(self, data):
         epdconfig.digital_write(self.dc_pin, 1)
         epdconfig.digital_write(self.cs_pin, 0)
         epdconfig.SPI.writebytes2(data)
         epdconfig.digital_write(self.cs_pin, 1)
 
-    def ReadBusy(self):
+    def ReadBusy(self, timeout_ms=BUSY_TIMEOUT_MS):
         logger.debug("e-Paper busy")
+        start = time.monotonic()
         self.send_command(0x71)
-        busy = epdconfig.digital_read(self.busy_pin)
-        while(busy == 0):
-            self.send_command(0x71)
-            busy = epdconfig.digital_read(self.busy_pin)
+        # Sleep on the BUSY edge when the backend supports it, otherwise poll.
+        # The controller drives the BUSY pin from its own state; 0x71 (get status)
+        # only queues the status register for an SPI read, which this driver never
+        # makes, so sending it once is enough for the edge wait. The polling path
+        # keeps re-sending it each time, as the vendor loop does.
+        wait_busy_release = getattr(epdconfig, 'wait_busy_release', None)
+        if wait_busy_release is not None:
+            released = wait_busy_release(timeout_ms / 1000.0)
+        else:
+            released = self._poll_busy(start + timeout_ms / 1000.0)
+        self.busy_ms = (time.monotonic() - start) * 1000
+        self.busy_total_ms += self.busy_ms
+        if not released:
+            raise BusyTimeoutError("e-Paper still busy after %d ms" % timeout_ms)
         epdconfig.delay_ms(20)
-        logger.debug("e-Paper busy release")
+        logger.debug("e-Paper busy release after %.0f ms", self.busy_ms)
+
+    def _poll_busy(self, deadline):
+        while epdconfig.digital_read(self.busy_pin) == 0:
+            if time.monotonic() >= deadline:
+                return False
+            epdconfig.delay_ms(BUSY_POLL_MS)
+            self.send_command(0x71)
+        return True
         
-    def init(self):
+    def _replay(self, sequence):
+        for step in sequence:
+            if step is WAIT_BUSY:
+                epdconfig.delay_ms(100)
+                self.ReadBusy()
+            else:
+                self.send_command_data(*step)
+
+    def _init_with(self, sequence):
         if (epdconfig.module_init() != 0):
             return -1
         # EPD hardware init start
         self.reset()
-        
-        self.send_command(0x06)     # btst
-        self.send_data(0x17)
-        self.send_data(0x17)
-        self.send_data(0x28)        # If an exception is displayed, try using 0x38
-        self.send_data(0x17)
-        
-        self.send_command(0x01)			#POWER SETTING
-        self.send_data(0x07)
-        self.send_data(0x07)    #VGH=20V,VGL=-20V
-        self.send_data(0x28)		#VDH=15V
-        self.send_data(0x17)		#VDL=-15V
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100)
-        self.ReadBusy()
-
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-
-        self.send_command(0x61)        	#tres
-        self.send_data(0x03)		#source 800
-        self.send_data(0x20)
-        self.send_data(0x01)		#gate 480
-        self.send_data(0xE0)
-
-        self.send_command(0X15)
-        self.send_data(0x00)
-
-        # If the screen appears gray, use the annotated initialization command
-        self.send_command(0X50)
-        self.send_data(0x10)
-        self.send_data(0x07)
-        # self.send_command(0X50)
-        # self.send_data(0x10)
-        # self.send_data(0x17)
-        # self.send_command(0X52)		
-        # self.send_data(0x03)
-
-        self.send_command(0X60)			#TCON SETTING
-        self.send_data(0x22)
-
+        self._replay(sequence)
         # EPD hardware init end
         return 0
+
+    def init(self):
+        return self._init_with(INIT_SEQUENCE)
     
     def init_fast(self):
-        if (epdconfig.module_init() != 0):
-            return -1
-        # EPD hardware init start
-        self.reset()
-        
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-
-        # If the screen appears gray, use the annotated initialization command
-        self.send_command(0X50)
-        self.send_data(0x10)
-        self.send_data(0x07)
-        # self.send_command(0X50)
-        # self.send_data(0x10)
-        # self.send_data(0x17)
-        # self.send_command(0X52)		
-        # self.send_data(0x03)
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100) 
-        self.ReadBusy()        #waiting for the electronic paper IC to release the idle signal
-
-        #Enhanced display drive(Add 0x06 command)
-        self.send_command(0x06)			#Booster Soft Start 
-        self.send_data (0x27)
-        self.send_data (0x27)   
-        self.send_data (0x18)		
-        self.send_data (0x17)		
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x5A)
-
-        # EPD hardware init end
-        return 0
+        return self._init_with(INIT_FAST_SEQUENCE)
     
     def init_part(self):
-        if (epdconfig.module_init() != 0):
-            return -1
-        # EPD hardware init start
-        self.reset()
-
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100) 
-        self.ReadBusy()        #waiting for the electronic paper IC to release the idle signal
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x6E)
-
-        # EPD hardware init end
-        return 0
+        return self._init_with(INIT_PART_SEQUENCE)
     
     # The feature will only be available on screens sold after 24/10/23
     def init_4Gray(self):
-        if (epdconfig.module_init() != 0):
-            return -1
-        # EPD hardware init start
-        self.reset()
-
-        self.send_command(0X00)			#PANNEL SETTING
-        self.send_data(0x1F)   #KW-3f   KWR-2F	BWROTP 0f	BWOTP 1f
-        
-        self.send_command(0X50)
-        self.send_data(0x10)
-        self.send_data(0x07)
-
-        self.send_command(0x04) #POWER ON
-        epdconfig.delay_ms(100) 
-        self.ReadBusy()        #waiting for the electronic paper IC to release the idle signal
-
-        #Enhanced display drive(Add 0x06 command)
-        self.send_command(0x06)			#Booster Soft Start 
-        self.send_data (0x27)
-        self.send_data (0x27)   
-        self.send_data (0x18)		
-        self.send_data (0x17)	
-
-        self.send_command(0xE0)
-        self.send_data(0x02)
-        self.send_command(0xE5)
-        self.send_data(0x5F)
-
-        # EPD hardware init end
-        return 0
+        return self._init_with(INIT_4GRAY_SEQUENCE)
 
     def getbuffer(self, image):
         img = image
@@ -245,66 +252,54 @@ class EPD:
         else:
             logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
             # return a blank buffer
-            return [0x00] * (int(self.width/8) * self.height)
+            return bytearray(int(self.width/8) * self.height)
 
-        buf = bytearray(img.tobytes('raw'))
         # The bytes need to be inverted, because in the PIL world 0=black and 1=white, but
         # in the e-paper world 0=white and 1=black.
-        for i in range(len(buf)):
-            buf[i] ^= 0xFF
-        return buf
+        return bytearray(img.tobytes('raw')).translate(_INVERT)
     
     def getbuffer_4Gray(self, image):
-        # logger.debug("bufsiz = ",int(self.width/8) * self.height)
-        buf = [0xFF] * (int(self.width / 4) * self.height)
-        image_monocolor = image.convert('L')
-        imwidth, imheight = image_monocolor.size
-        pixels = image_monocolor.load()
-        i=0
-        # logger.debug("imwidth = %d, imheight = %d",imwidth,imheight)
+        # Four pixels per byte, two bits each, leftmost pixel in the high bits
+        imwidth, imheight = image.size
         if(imwidth == self.width and imheight == self.height):
             logger.debug("Vertical")
-            for y in range(imheight):
-                for x in range(imwidth):
-                    # Set the bits for the column of pixels at the current position.
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((x + (y * self.width))/4)] = ((pixels[x-3, y]&0xc0) | (pixels[x-2, y]&0xc0)>>2 | (pixels[x-1, y]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6)
-                        
+            img = image.convert('L')
         elif(imwidth == self.height and imheight == self.width):
             logger.debug("Horizontal")
-            for x in range(imwidth):
-                for y in range(imheight):
-                    newx = y
-                    newy = self.height - x - 1
-                    if(pixels[x, y] == 0xC0):
-                        pixels[x, y] = 0x80
-                    elif (pixels[x, y] == 0x80):
-                        pixels[x, y] = 0x40
-                    i= i+1
-                    if(i%4 == 0):
-                        buf[int((newx + (newy * self.width))/4)] = ((pixels[x, y-3]&0xc0) | (pixels[x, y-2]&0xc0)>>2 | (pixels[x, y-1]&0xc0)>>4 | (pixels[x, y]&0xc0)>>6) 
-        return buf
+            # image has correct dimensions, but needs to be rotated
+            img = image.convert('L').rotate(90, expand=True)
+        else:
+            logger.warning("Wrong image dimensions: must be " + str(self.width) + "x" + str(self.height))
+            return bytearray(b'\xff' * (int(self.width / 4) * self.height))
+
+        from PIL import Image
+        levels = img.point(_GRAY_LEVELS)
+        # The "P;2" packer packs 2-bit values four to a byte in the order required
+        return bytearray(Image.frombytes('P', levels.size, levels.tobytes()).tobytes('raw', 'P;2'))
+
+    def getplanes_4Gray(self, image):
+        """Return the (old, new) RAM planes for a getbuffer_4Gray() frame as bytes."""
+        data = bytes(image)
+        planes = []
+        for hi, lo in ((_GRAY_OLD_HI, _GRAY_OLD_LO), (_GRAY_NEW_HI, _GRAY_NEW_LO)):
+            # Each plane byte takes a nibble from each of two consecutive 4-pixel bytes
+            high = int.from_bytes(data[0::2].translate(hi), 'big')
+            low = int.from_bytes(data[1::2].translate(lo), 'big')
+            planes.append((high | low).to_bytes(len(data) // 2, 'big'))
+        return tuple(planes)
+
+    def getplanes(self, image):
+        """Return the (old, new) RAM planes for a getbuffer() frame as bytes."""
+        new = bytes(image)
+        return new.translate(_INVERT), new
 
     def display(self, image):
-        if(self.width % 8 == 0):
-            Width = self.width // 8
-        else:
-            Width = self.width // 8 +1
-        Height = self.height
-        image1 = [0xFF] * int(self.width * self.height / 8)
-        for j in range(Height):
-                for i in range(Width):
-                    image1[i + j * Width] = ~image[i + j * Width]
+        old, new = self.getplanes(image)
         self.send_command(0x10)
-        self.send_data2(image1)
+        self.send_data2(old)
 
         self.send_command(0x13)
-        self.send_data2(image)
+        self.send_data2(new)
 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
@@ -312,15 +307,20 @@ class EPD:
 
     def Clear(self):
         self.send_command(0x10)
-        self.send_data2([0xFF] * int(self.width * self.height / 8))
+        self.send_data2(_BLANK_OLD)
         self.send_command(0x13)
-        self.send_data2([0x00] * int(self.width * self.height / 8))
+        self.send_data2(_BLANK_NEW)
 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
     def display_Partial(self, Image, Xstart, Ystart, Xend, Yend):
+        """Refresh one window from Image, exactly Width * Height bytes of it.
+
+        Image holds the window's rows packed Width = (Xend - Xstart) / 8 bytes
+        apart, not a full frame; display_Partial_window() takes a full frame.
+        """
         if((Xstart % 8 + Xend % 8 == 8 & Xstart % 8 > Xend % 8) | Xstart % 8 + Xend % 8 == 0 | (Xend - Xstart)%8 == 0):
             Xstart = Xstart // 8 * 8
             Xend = Xend // 8 * 8
@@ -333,116 +333,72 @@ class EPD:
                 
         Width = (Xend - Xstart) // 8
         Height = Yend - Ystart
-	
-        self.send_command(0x50)
-        self.send_data(0xA9)
-        self.send_data(0x07)
 
-        self.send_command(0x91)		#This command makes the display enter partial mode
-        self.send_command(0x90)		#resolution setting
-        self.send_data (Xstart//256)
-        self.send_data (Xstart%256)   #x-start    
+        self.set_partial_window(Xstart, Ystart, Xend, Yend)
+
+        # Only the window's bytes are sent; anything past Width * Height would overrun
+        # the window set above
+        image1 = bytes(Image[:Width * Height]).translate(_INVERT)
 
-        self.send_data ((Xend-1)//256)		
-        self.send_data ((Xend-1)%256)  #x-end	
+        self.send_command(0x13)   #Write Black and White image to RAM
+        self.send_data2(image1)
+
+        self.send_command(0x12)
+        epdconfig.delay_ms(100)
+        self.ReadBusy()
 
-        self.send_data (Ystart//256)  #
-        self.send_data (Ystart%256)   #y-start    
+    def display_Partial_window(self, frame, Xstart, Ystart, Xend, Yend):
+        # frame is a full getbuffer() frame; only the bytes inside the window are sent
+        Xstart = Xstart // 8 * 8
+        Xend = (Xend + 7) // 8 * 8
 
-        self.send_data ((Yend-1)//256)		
-        self.send_data ((Yend-1)%256)  #y-end
-        self.send_data (0x01)
+        stride = self.width // 8
+        first, last = Xstart // 8, Xend // 8
+        view = memoryview(frame)
+        if first == 0 and last == stride:
+            window = bytes(view[Ystart * stride:Yend * stride])
+        else:
+            window = b''.join(view[y * stride + first:y * stride + last] for y in range(Ystart, Yend))
 
-        image1 = [0xFF] * int(self.width * self.height / 8)
-        for j in range(Height):
-                for i in range(Width):
-                    image1[i + j * Width] = ~Image[i + j * Width]
+        self.set_partial_window(Xstart, Ystart, Xend, Yend)
 
         self.send_command(0x13)   #Write Black and White image to RAM
-        self.send_data2(image1)
+        self.send_data2(window.translate(_INVERT))
 
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
+    def set_partial_window(self, Xstart, Ystart, Xend, Yend):
+        self.send_command_data(0x50, (0xA9, 0x07))
+        self.send_command_data(0x91)		#This command makes the display enter partial mode
+        self.send_command_data(0x90, (		#resolution setting
+            Xstart//256, Xstart%256,          #x-start
+            (Xend-1)//256, (Xend-1)%256,      #x-end
+            Ystart//256, Ystart%256,          #y-start
+            (Yend-1)//256, (Yend-1)%256,      #y-end
+            0x01,
+        ))
+
     def display_4Gray(self, image):
+        old, new = self.getplanes_4Gray(image)
         self.send_command(0x10)
-        for i in range(0, 48000):     
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01  
-                    elif(temp2 == 0x80): 
-                        temp3 |= 0x01 
-                    else: #0x40
-                        temp3 |= 0x00 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x01
-                    else :   #0x40
-                        temp3 |= 0x00	
-                    if(j!=1 or k!=1):				
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-            
-        self.send_command(0x13)	       
-        for i in range(0, 48000):       
-            temp3=0
-            for j in range(0, 2):
-                temp1 = image[i*2+j]
-                for k in range(0, 2):
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0):
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00):
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00
-                    else: #0x40
-                        temp3 |= 0x01 
-                    temp3 <<= 1	
-                    
-                    temp1 <<= 2
-                    temp2 = temp1&0xC0 
-                    if(temp2 == 0xC0): 
-                        temp3 |= 0x00
-                    elif(temp2 == 0x00): 
-                        temp3 |= 0x01
-                    elif(temp2 == 0x80):
-                        temp3 |= 0x00 
-                    else:    #0x40
-                            temp3 |= 0x01	
-                    if(j!=1 or k!=1):					
-                        temp3 <<= 1
-                    temp1 <<= 2
-            self.send_data(temp3)
-        
+        self.send_data2(old)
+
+        self.send_command(0x13)
+        self.send_data2(new)
+
         self.send_command(0x12)
         epdconfig.delay_ms(100)
         self.ReadBusy()
 
     def sleep(self):
-        self.send_command(0x50)
-        self.send_data(0XF7)
+        self.send_command_data(0x50, (0XF7,))
         
-        self.send_command(0x02) # POWER_OFF
+        self.send_command_data(0x02) # POWER_OFF
         self.ReadBusy()
         
-        self.send_command(0x07) # DEEP_SLEEP
-        self.send_data(0XA5)
+        self.send_command_data(0x07, (0XA5,)) # DEEP_SLEEP
         
         epdconfig.delay_ms(2000)
         epdconfig.module_exit()
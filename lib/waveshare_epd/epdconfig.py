@@ -27,11 +27,11 @@
 # THE SOFTWARE.
 #
 
+import functools
 import os
 import logging
 import sys
 import time
-import subprocess
 
 from ctypes import *
 
@@ -98,6 +98,10 @@ class RaspberryPi:
     def delay_ms(self, delaytime):
         time.sleep(delaytime / 1000.0)
 
+    def wait_busy_release(self, timeout):
+        # BUSY is low while the panel works; the Button reads "pressed" once it goes high
+        return self.GPIO_BUSY_PIN.wait_for_press(timeout)
+
     def spi_writebyte(self, data):
         self.SPI.writebytes(data)
 
@@ -301,22 +305,266 @@ class SunriseX3:
         self.GPIO.cleanup([self.RST_PIN, self.DC_PIN, self.CS_PIN, self.BUSY_PIN], self.PWR_PIN)
 
 
-if sys.version_info[0] == 2:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE)
-else:
-    process = subprocess.Popen("cat /proc/cpuinfo | grep Raspberry", shell=True, stdout=subprocess.PIPE, text=True)
-output, _ = process.communicate()
-if sys.version_info[0] == 2:
-    output = output.decode(sys.stdout.encoding)
+class Virtual:
+    """Headless stand-in for the panel, selected with EPD_BACKEND=virtual.
+
+    Every command and data byte is captured as it would go over SPI and
+    decoded into an emulated 800x480 controller RAM for both planes. BUSY
+    follows a timing model on a virtual clock, so delays and refreshes
+    cost no real time while the modelled wait is still accounted.
+    """
+    # Pin definition
+    RST_PIN  = 17
+    DC_PIN   = 25
+    CS_PIN   = 8
+    BUSY_PIN = 24
+    PWR_PIN  = 18
+
+    WIDTH  = 800
+    HEIGHT = 480
+
+    # Modelled BUSY time in ms per refresh waveform, and for power switching
+    REFRESH_MS = {'full': 4000, 'fast': 1500, 'partial': 420, '4gray': 3000}
+    POWER_ON_MS  = 40
+    POWER_OFF_MS = 30
+
+    # Waveform selected by the cascade setting (0xE5) byte each init sends
+    _WAVEFORMS = {0x5A: 'fast', 0x6E: 'partial', 0x5F: '4gray'}
+    _INVERT = bytes(range(0xFF, -1, -1))
+
+    def __init__(self):
+        self.SPI = _VirtualSPI(self)
+        self.stride = self.WIDTH // 8
+        self.old = bytearray(self.stride * self.HEIGHT)      # 0x10 plane
+        self.new = bytearray(self.stride * self.HEIGHT)      # 0x13 plane
+        self.shown_old = bytearray(self.stride * self.HEIGHT)
+        self.shown_new = bytearray(self.stride * self.HEIGHT)
+        self.shown_gray = False
+        self.capture = []   # [command, bytearray(data)] in the order sent
+        self.now_ms = 0.0
+        self.busy_until = 0.0
+        self.dc = 0
+        self.stats = {}
+        self._reset_controller()
+        self.reset_stats()
+
+    def _reset_controller(self):
+        self.command = None
+        self.cursor = 0
+        self.params = bytearray()
+        self.partial = False
+        self.window = (0, 0, self.WIDTH, self.HEIGHT)
+        self.waveform = 'full'
+        self.inverted = False   # VCOM and data interval (0x50) DDX bit flips the data polarity
+        self.asleep = False
+
+    def reset_stats(self):
+        # Updated in place: the module-level names alias these objects
+        self.stats.clear()
+        self.stats.update({
+            'transfers': 0,         # SPI writes
+            'commands': 0,
+            'data_bytes': 0,
+            'overflow_bytes': 0,    # RAM writes past the end of the window
+            'refreshes': {},
+            'busy_ms': 0.0,         # modelled time BUSY was held
+            'delay_ms': 0.0,        # time spent in delay_ms()
+        })
+        del self.capture[:]
+
+    def digital_write(self, pin, value):
+        if pin == self.DC_PIN:
+            self.dc = value
+        elif pin == self.RST_PIN and not value:
+            self._reset_controller()
+
+    def digital_read(self, pin):
+        if pin == self.BUSY_PIN:
+            return 0 if self.now_ms < self.busy_until else 1
+        return 0
+
+    def delay_ms(self, delaytime):
+        self._advance(delaytime)
+        self.stats['delay_ms'] += delaytime
+
+    def wait_busy_release(self, timeout):
+        remaining = self.busy_until - self.now_ms
+        if remaining > timeout * 1000:
+            self._advance(timeout * 1000)
+            return False
+        self._advance(max(0.0, remaining))
+        return True
+
+    def _advance(self, ms):
+        busy = min(ms, max(0.0, self.busy_until - self.now_ms))
+        self.stats['busy_ms'] += busy
+        self.now_ms += ms
+
+    def spi_writebyte(self, data):
+        self._write(data)
+
+    def spi_writebyte2(self, data):
+        self._write(data)
+
+    def module_init(self, cleanup=False):
+        return 0
 
-if "Raspberry" in output:
-    implementation = RaspberryPi()
-elif os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
-    implementation = SunriseX3()
-else:
-    implementation = JetsonNano()
+    def module_exit(self, cleanup=False):
+        logger.debug("virtual panel released")
 
-for func in [x for x in dir(implementation) if not x.startswith('_')]:
-    setattr(sys.modules[__name__], func, getattr(implementation, func))
+    def _write(self, data):
+        data = bytes(data) if isinstance(data, (bytes, bytearray, memoryview)) else bytes(d & 0xFF for d in data)
+        self.stats['transfers'] += 1
+        if self.dc:
+            self._data(data)
+        else:
+            for command in data:
+                self._command(command)
+
+    def _command(self, command):
+        self.stats['commands'] += 1
+        self.capture.append([command, bytearray()])
+        self.command = command
+        self.cursor = 0
+        self.params = bytearray()
+        if command == 0x04:                 # POWER ON
+            self._busy(self.POWER_ON_MS)
+        elif command == 0x02:               # POWER OFF
+            self._busy(self.POWER_OFF_MS)
+        elif command == 0x91:               # enter partial mode
+            self.partial = True
+        elif command == 0x92:               # leave partial mode
+            self.partial = False
+            self.window = (0, 0, self.WIDTH, self.HEIGHT)
+        elif command == 0x12:               # DISPLAY REFRESH
+            self._refresh()
+
+    def _data(self, data):
+        self.stats['data_bytes'] += len(data)
+        if self.capture:
+            self.capture[-1][1] += data
+        else:
+            self.capture.append([None, bytearray(data)])
+
+        if self.command in (0x10, 0x13):
+            self._write_ram(self.old if self.command == 0x10 else self.new, data)
+            return
+        self.params += data
+        if self.command == 0x90 and len(self.params) >= 9:
+            p = self.params
+            self.window = (p[0] << 8 | p[1], p[4] << 8 | p[5], (p[2] << 8 | p[3]) + 1, (p[6] << 8 | p[7]) + 1)
+        elif self.command == 0x50:
+            self.inverted = bool(self.params[0] & 0x01)
+        elif self.command == 0xE5:
+            self.waveform = self._WAVEFORMS.get(self.params[0], 'full')
+        elif self.command == 0x07 and self.params[0] == 0xA5:
+            self.asleep = True
+
+    def _write_ram(self, plane, data):
+        """Write data at the RAM cursor, row by row within the current window."""
+        x0, y0, x1, y1 = self.window if self.partial else (0, 0, self.WIDTH, self.HEIGHT)
+        first, row_bytes = x0 // 8, (x1 - x0 + 7) // 8
+        size = row_bytes * (y1 - y0)
+        usable = max(0, min(len(data), size - self.cursor))
+        self.stats['overflow_bytes'] += len(data) - usable
+        if row_bytes == self.stride:
+            start = y0 * self.stride + self.cursor
+            plane[start:start + usable] = data[:usable]
+        else:
+            done = 0
+            while done < usable:
+                row, col = divmod(self.cursor + done, row_bytes)
+                take = min(row_bytes - col, usable - done)
+                start = (y0 + row) * self.stride + first + col
+                plane[start:start + take] = data[done:done + take]
+                done += take
+        self.cursor += len(data)
+
+    def _refresh(self):
+        waveform = 'partial' if self.partial else self.waveform
+        x0, y0, x1, y1 = self.window if self.partial else (0, 0, self.WIDTH, self.HEIGHT)
+        first, last = x0 // 8, (x1 + 7) // 8
+        for y in range(y0, y1):
+            start, end = y * self.stride + first, y * self.stride + last
+            self.shown_old[start:end] = self.old[start:end]
+            self.shown_new[start:end] = self.new[start:end]
+            if self.inverted:
+                self.shown_new[start:end] = self.shown_new[start:end].translate(self._INVERT)
+        self.shown_gray = waveform == '4gray'
+        self.stats['refreshes'][waveform] = self.stats['refreshes'].get(waveform, 0) + 1
+        self._busy(self.REFRESH_MS[waveform])
+
+    def _busy(self, ms):
+        self.busy_until = max(self.busy_until, self.now_ms) + ms
+
+    def panel_image(self):
+        """What the panel shows after the last refresh, as a PIL "L" image."""
+        from PIL import Image, ImageChops
+        new = Image.frombytes('1', (self.WIDTH, self.HEIGHT), bytes(self.shown_new)).convert('L')
+        if not self.shown_gray:
+            return ImageChops.invert(new)  # 1 = black, after any DDX inversion
+        old = Image.frombytes('1', (self.WIDTH, self.HEIGHT), bytes(self.shown_old)).convert('L')
+        # (old, new) bits: (0, 0) white, (1, 0) light gray, (0, 1) dark gray, (1, 1) black
+        pairs = ImageChops.add(old.point(lambda v: v and 1), new.point(lambda v: v and 2))
+        return pairs.point([0xFF, 0xC0, 0x80, 0x00] + [0] * 252)
+
+
+class _VirtualSPI:
+    def __init__(self, panel):
+        self.panel = panel
+
+    def writebytes(self, data):
+        self.panel._write(data)
+
+    def writebytes2(self, data):
+        self.panel._write(data)
+
+
+BACKENDS = {
+    'raspberrypi': RaspberryPi,
+    'jetsonnano': JetsonNano,
+    'sunrisex3': SunriseX3,
+    'virtual': Virtual,
+}
+
+
+@functools.lru_cache(maxsize=None)
+def cpuinfo():
+    """Contents of /proc/cpuinfo, read once."""
+    try:
+        with open('/proc/cpuinfo', 'r') as file:
+            return file.read()
+    except OSError:
+        return ''
+
+
+def detect_backend():
+    """Name of the backend for this board, or the one EPD_BACKEND names."""
+    backend = os.environ.get('EPD_BACKEND', '').lower()
+    if backend:
+        if backend not in BACKENDS:
+            raise RuntimeError('Unknown EPD_BACKEND %r, expected one of %s' % (backend, ', '.join(BACKENDS)))
+        return backend
+    if 'Raspberry' in cpuinfo():
+        return 'raspberrypi'
+    if os.path.exists('/sys/bus/platform/drivers/gpio-x3'):
+        return 'sunrisex3'
+    return 'jetsonnano'
+
+
+def __getattr__(name):
+    # The backend opens GPIO and SPI libraries, so it is only created on first use.
+    # Its public attributes then become module globals and later lookups skip this hook.
+    module = sys.modules[__name__]
+    if name.startswith('__') or 'implementation' in module.__dict__:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name))
+    implementation = BACKENDS[detect_backend()]()
+    module.implementation = implementation
+    for func in [x for x in dir(implementation) if not x.startswith('_')]:
+        setattr(module, func, getattr(implementation, func))
+    try:
+        return getattr(module, name)
+    except AttributeError:
+        raise AttributeError("module %r has no attribute %r" % (__name__, name)) from None
 
 ### END OF FILE ###
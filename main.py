@@ -1,87 +1,228 @@
 import sys
+import startup_profile
+if '--startup-profile' in sys.argv[1:]:
+  # Installed before the other imports so they are timed too
+  startup_profile.install()
+
 import os
+import json
+import time
+import argparse
+import functools
 from pathlib import Path
 libdir = str(Path(__file__).resolve().parent / 'lib')
 if os.path.exists(libdir):
     sys.path.append(libdir)
 
-from PIL import Image, ImageDraw, ImageFont
-from manage_refresh import get_refresh_count, set_refresh_count
-from tfl import get_arrivals_and_latest_location, get_arrivals_and_destination, fetch_bus_arrivals_concurrently
-from datetime import datetime, timedelta
+from PIL import ImageFont
+from cadence import MIN_INTERVAL, ServiceHours, next_refresh
+from frame_diff import changed_pixels, dirty_regions
+from framebuffer import get_frame_store
+import metrics
+from layout import compile_layout, draw_fields, load_layout_spec
+from predictions import FRESH_FOR, PredictionStore, advance
+from refresh_policy import CLEAN, FULL, PARTIAL, QUIET_HOUR, Decision, RefreshPolicy
+from startup_profile import phase
+from template import load_template
+from tfl import ArrivalsBatch, count_connection_stats, group_arrivals_by_line, group_arrivals_by_platform, summarise_destinations, summarise_latest_location
+from datetime import datetime
 
 DEBUG = False
 font_path = './fonts/dejavu-sans-bold.ttf'
 
+# Longest gap between full refreshes, and between refreshes, in seconds
+FULL_REFRESH_INTERVAL = 4 * 60 * 60
+PARTIAL_REFRESH_INTERVAL = 5 * 60
+# Polling resumes this many seconds before a suspended daemon wakes
+POLL_LEAD = 60
+# Polled data older than this is reported as stale
+STALE_AFTER = 5 * 60
+
 if DEBUG == False:
-  from waveshare_epd import epd7in5_V2
   picdir = os.path.join(os.path.dirname(os.path.dirname(os.path.realpath(__file__))), 'pic')
   font_path = os.path.join(picdir, 'DejaVuSans-Bold.ttf')
-  epd = epd7in5_V2.EPD()
+
+# Debug copy of the last frame; the frame store is what refreshes read back
+PNG_PATH = "output.png"
+save_png = DEBUG
 
 # 0 = black, 255 = white
 background_color = 255
 font_color = 0
 
-kingsbury_station_id = '940GZZLUKBY'
-kingsbury_platform_name = 'Southbound - Platform 2'
-wembley_park_station_id = '940GZZLUWYP'
-wembley_park_platform_name = 'Southbound - Platform 5'
-
-bus_list = [
-  {
-    'direction': 'Wembley',
-    'station_id': '490015769S',
-    'lineId': ['79']
-  },
-  {
-    'direction': 'Harrow',
-    'station_id': '490000128B',
-    'lineId': ['183', 'sl10']
-  },
-  {
-    'direction': 'Hendon',
-    'station_id': '490000128A',
-    'lineId': ['183', 'sl10'],
-  },
-]
-
-# Load fonts
-font_large = ImageFont.truetype(font_path, 30)
-font_medium = ImageFont.truetype(font_path, 24)
-font_small = ImageFont.truetype(font_path, 18)
+# Stops to fetch: on-screen tube platforms and buses, plus extra stops to monitor
+with open(Path(__file__).resolve().parent / 'sources.json', 'r') as file:
+  sources = json.load(file)
 
-# Create an empty image
-WIDTH, HEIGHT = 800, 480
-count = get_refresh_count()
+kingsbury_station_id = sources['tube']['kingsbury']['station_id']
+kingsbury_platform_name = sources['tube']['kingsbury']['platform']
+wembley_park_station_id = sources['tube']['wembley_park']['station_id']
+wembley_park_platform_name = sources['tube']['wembley_park']['platform']
+
+bus_list = sources['bus']
+
+# The fields each stop fills; the first one carries the stop's staleness marker
+screen_fields = {
+  kingsbury_station_id: ['kingsbury_times', 'kingsbury_location'],
+  wembley_park_station_id: ['wembley_0', 'wembley_1', 'wembley_2'],
+  '490015769S': ['bus_79_wembley'],
+  '490000128B': ['bus_183_harrow', 'bus_sl10_harrow'],
+  '490000128A': ['bus_183_hendon', 'bus_sl10_hendon'],
+}
+
+# Seconds a poll is trusted; countdowns are extrapolated locally in between
+poll_interval = sources.get('poll_interval', FRESH_FOR)
+
+# Hours the board is refreshed in; None to refresh around the clock
+service_hours = ServiceHours.from_config(sources.get('service_hours'))
+
+# The cron interval in one-shot mode, the longest gap between refreshes in daemon mode
+refresh_interval = PARTIAL_REFRESH_INTERVAL
+# Shortest gap between refreshes; None keeps refresh_interval fixed, as cron does
+min_interval = None
+# Epoch seconds of the next refresh, as shown in the footer of the last frame
+next_wake = None
+
+# Background poller, only running in daemon mode
+poller = None
+# Last polled arrivals for one-shot runs, shared between them on disk
+predictions = PredictionStore(fresh_for=poll_interval)
 
-if DEBUG:
-  count = 0
+# Screen layout: sections, fields and fonts live in layout.json
+layout_spec = load_layout_spec(Path(__file__).resolve().parent / 'layout.json')
 
-kingsburyLatestArrivals = ''
-wembleyLatestArrivals = ''
-buses_to_wembley = ''
-buses_to_harrow = ''
-buses_to_hendon = ''
+font_sizes = layout_spec['fonts']
+
+# Create an empty image
+WIDTH, HEIGHT = layout_spec['size']
+
+# The panel driver, created on first use
+epd = None
+
+@functools.lru_cache(maxsize=None)
+def get_fonts():
+  with phase('fonts'):
+    return {name: ImageFont.truetype(font_path, size) for name, size in font_sizes.items()}
+
+@functools.lru_cache(maxsize=None)
+def get_layout():
+  """Region table shared by the full render and the partial refresh."""
+  fonts = get_fonts()
+  with phase('layout'):
+    return compile_layout(layout_spec, fonts)
+
+def get_template():
+  layout = get_layout()
+  with phase('template'):
+    return load_template(font_path, get_fonts(), font_sizes, layout.static_text, layout.dividers, (WIDTH, HEIGHT))
+
+def get_epd():
+  """The panel driver; importing it and opening GPIO and SPI wait until a frame is sent."""
+  global epd
+  if epd is None:
+    with phase('epd'):
+      from waveshare_epd import epd7in5_V2
+      epd = epd7in5_V2.EPD()
+    # Frame conversion, the frame's SPI transfer and the BUSY waits, for the per-cycle metrics
+    metrics.instrument(epd, 'getbuffer', 'getbuffer')
+    metrics.instrument(epd, 'send_data2', 'spi', counter='spi_bytes')
+    metrics.instrument(epd, 'ReadBusy', 'busy')
+  return epd
+
+def screen_batch():
+  # One upstream request per distinct stop, shared by every section that needs it
+  # A stop's max_age in sources.json overrides how long its cached response is trusted
+  batch = ArrivalsBatch()
+  batch.add_station(kingsbury_station_id, kingsbury_platform_name, sources['tube']['kingsbury'].get('max_age'))
+  batch.add_station(wembley_park_station_id, wembley_park_platform_name, sources['tube']['wembley_park'].get('max_age'))
+  for bus in bus_list:
+    batch.add_lines(bus['station_id'], bus['lineId'], bus.get('max_age'))
+  return batch
+
+def fetch_sources():
+  """Arrivals for every on-screen stop with countdowns as of now, and {stop: age} for stale stops.
+
+  The daemon reads the background poller; a one-shot run serves the
+  last-known-good arrivals and only polls stops whose stored predictions
+  are too old or have lapsed, without waiting long for them.
+  """
+  now = time.time()
+  if poller is not None:
+    snapshot = poller.snapshot()
+    return {key: advance(arrivals, now) for key, arrivals in snapshot.items()}, poller.stale(STALE_AFTER)
+  calls = screen_batch().calls()
+  # Polling is suspended outside service hours; a cleaning refresh then draws the stored arrivals
+  polling = service_hours is None or service_hours.in_service(now)
+  due = {key: call for key, call in calls.items() if polling and predictions.needs_poll(key, now)}
+  predictions.revalidate(due)
+  if not polling:
+    print("Outside service hours, drawing the stored arrivals without polling")
+  elif len(due) < len(calls):
+    print(f"Polled {len(due)} of {len(calls)} stops, extrapolated the rest")
+  now = time.time()
+  return predictions.current(calls, now), predictions.stale(calls, STALE_AFTER, now)
+
+def start_poller():
+  """Poll every configured stop in the background within the request budget."""
+  from poll_scheduler import PollScheduler
+  scheduler = PollScheduler(sources.get('requests_per_minute', 50))
+  for station_id, call in screen_batch().calls().items():
+    scheduler.add(station_id, call, poll_interval, on_screen=True)
+
+  monitor = ArrivalsBatch()
+  for stop in sources.get('monitor', []):
+    if stop.get('lineId'):
+      monitor.add_lines(stop['station_id'], stop['lineId'], stop.get('max_age'))
+    else:
+      monitor.add_station(stop['station_id'], stop.get('platform'), stop.get('max_age'))
+  for station_id, call in monitor.calls().items():
+    if station_id not in scheduler:
+      scheduler.add(station_id, call, poll_interval, on_screen=False)
+
+  # Fill what the budget allows before the first frame is drawn
+  scheduler.run_pending()
+  scheduler.start()
+  return scheduler
+
+def mark_stale(text, age):
+  """text with a note of how old its data is; age is None when there never was any."""
+  if age is None:
+    return f"{text} (no data)" if text else "No data"
+  as_of = datetime.fromtimestamp(time.time() - age).strftime("%H:%M")
+  return f"{text} (as of {as_of})" if text else f"No data since {as_of}"
 
 def full_refresh_api_calls():
-  kingsburyLatestArrivals = get_arrivals_and_latest_location(kingsbury_station_id, kingsbury_platform_name)
-  wembleyLatestArrivals = get_arrivals_and_destination(wembley_park_station_id, wembley_park_platform_name)
-  bus_arrivals = fetch_bus_arrivals_concurrently(bus_list)
+  arrivals, stale = fetch_sources()
+  if stale:
+    print(f"Stale sources this refresh: {', '.join(sorted(stale))}")
+  with metrics.timed('group'):
+    return group_sources(arrivals, stale)
+
+def group_sources(arrivals, stale):
+  bus_arrivals = {
+    bus['station_id']: group_arrivals_by_line(arrivals.get(bus['station_id'], []), bus['lineId'])
+    for bus in bus_list
+  }
+  # Every arrival the screen shows, for working out when it next changes
+  on_screen = group_arrivals_by_platform(arrivals.get(kingsbury_station_id, []), kingsbury_platform_name)
+  on_screen += group_arrivals_by_platform(arrivals.get(wembley_park_station_id, []), wembley_park_platform_name)
+  for bus in bus_list:
+    on_screen += [arrival for arrival in arrivals.get(bus['station_id'], []) if arrival.line in bus['lineId']]
 
   return {
-    "kingsburyLatestArrivals": kingsburyLatestArrivals,
-    "wembleyLatestArrivals": wembleyLatestArrivals,
+    "kingsburyLatestArrivals": summarise_latest_location(arrivals.get(kingsbury_station_id, []), kingsbury_platform_name),
+    "wembleyLatestArrivals": summarise_destinations(arrivals.get(wembley_park_station_id, []), wembley_park_platform_name),
     "buses_to_wembley": bus_arrivals.get('490015769S', {}),
     "buses_to_harrow": bus_arrivals.get('490000128B', {}),
-    "buses_to_hendon": bus_arrivals.get('490000128A', {})
+    "buses_to_hendon": bus_arrivals.get('490000128A', {}),
+    "on_screen": on_screen,
+    "stale": stale
   }
 
-def partial_refresh_api_call():
-  return get_arrivals_and_latest_location(kingsbury_station_id, kingsbury_platform_name)
-
 def generate_image():
-  result = full_refresh_api_calls()
+  global next_wake
+  with phase('fetch'):
+    result = full_refresh_api_calls()
   kingsburyLatestArrivals = result['kingsburyLatestArrivals']
   wembleyLatestArrivals = result['wembleyLatestArrivals']
   buses_to_wembley = result['buses_to_wembley']
@@ -93,91 +234,199 @@ def generate_image():
   current_date = now.strftime("%A, %B %d")
   current_time = now.strftime("%H:%M")
 
-  # Add 5 minutes to the current time
-  time_plus_x_minutes = now + timedelta(minutes=5)
-  current_time_plus_five = time_plus_x_minutes.strftime("%H:%M")
-
-  image = Image.new("1", (WIDTH, HEIGHT), background_color)  # 1-bit monochrome image
-  draw = ImageDraw.Draw(image)
-  # Section: Weather & Pollution
-  draw.text((10, 10), "London Underground & Bus", font=font_large, fill=font_color)
-
-  bbox = draw.textbbox((0, 0), current_date, font=font_small)
-  current_date_width = bbox[2] - bbox[0]
-  current_date_position = WIDTH - current_date_width - 10
-  draw.text((current_date_position, 20), f"{current_date}", font=font_small, fill=font_color)
-
-
-  # Divider
-  draw.line((0, 50, WIDTH, 50), fill=font_color, width=5)
-
-  # Section: Jubilee Southbound Arrivals
-  draw.text((10, 60), "Jubilee Southbound Arrivals - Kingsbury", font=font_medium, fill=font_color)
-
-  draw.text((10, 95), "Stratford - " + str(kingsburyLatestArrivals['arrival_times']), font=font_small, fill=font_color)
-  draw.text((10, 120), "Current Location - " + str(kingsburyLatestArrivals['current_location']), font=font_small, fill=font_color)
-
-  # Divider
-  draw.line((0, 145, WIDTH, 145), fill=font_color, width=1)
-
-  # Section: Jubilee Southbound Arrivals
-  draw.text((10, 155), "Metropolitan Southbound Arrivals - Wembley Park", font=font_medium, fill=font_color)
-
-  draw.text((10, 190), str(wembleyLatestArrivals[0]['destination']) + " - " + str(wembleyLatestArrivals[0]['arrival_times']), font=font_small, fill=font_color)
-  draw.text((10, 215), str(wembleyLatestArrivals[1]['destination']) + " - " + str(wembleyLatestArrivals[1]['arrival_times']), font=font_small, fill=font_color)
-  if (len(wembleyLatestArrivals) > 2):
-    draw.text((10, 240), str(wembleyLatestArrivals[2]['destination']) + " - " + str(wembleyLatestArrivals[2]['arrival_times']), font=font_small, fill=font_color)
-
-  # Divider
-  draw.line((0, 265, WIDTH, 265), fill=font_color, width=1)
-
-  # Section: Bus Schedules
-  draw.text((10, 275), "Bus Schedule", font=font_medium, fill=font_color)
-
-  draw.text((10, 310), "79 to Wembley - " + buses_to_wembley.get('79', ''), font=font_small, fill=font_color)
-  draw.text((10, 335), "183 to Harrow - " + buses_to_harrow.get('183', ''), font=font_small, fill=font_color)
-  draw.text((10, 360), "SL10 to Harrow - " + buses_to_harrow.get('sl10', ''), font=font_small, fill=font_color)
-  draw.text((10, 385), "183 to Hendon - " + buses_to_hendon.get('183', ''), font=font_small, fill=font_color)
-  draw.text((10, 410), "SL10 to Hendon - " + buses_to_hendon.get('sl10', ''), font=font_small, fill=font_color)
-
-  # Divider
-  draw.line((0, 435, WIDTH, 435), fill=font_color, width=1)
-
-  draw.text((10, 450), f"Last Update: {current_time}", font=font_small, fill=font_color)
-
-  # Footer: Date and Time
-  draw.text((590, 450), f"Next Update: {current_time_plus_five}", font=font_small, fill=font_color)
+  # When the screen next changes, within the refresh interval and service hours
+  next_wake = next_refresh(result['on_screen'], now.timestamp(), service_hours, refresh_interval, min_interval)
+  next_update = datetime.fromtimestamp(next_wake).strftime("%H:%M")
+
+  values = {
+    "date": current_date,
+    "kingsbury_times": kingsburyLatestArrivals['arrival_times'],
+    "kingsbury_location": kingsburyLatestArrivals['current_location'],
+    "bus_79_wembley": buses_to_wembley.get('79', ''),
+    "bus_183_harrow": buses_to_harrow.get('183', ''),
+    "bus_sl10_harrow": buses_to_harrow.get('sl10', ''),
+    "bus_183_hendon": buses_to_hendon.get('183', ''),
+    "bus_sl10_hendon": buses_to_hendon.get('sl10', ''),
+    "last_update": current_time,
+    "next_update": next_update,
+  }
+  # Up to three destinations; a quiet or failing stop may return fewer
+  for index, destination in enumerate(wembleyLatestArrivals[:3]):
+    values[f"wembley_{index}"] = str(destination['destination']) + " - " + str(destination['arrival_times'])
+
+  # Fields served from old data say how old, on the stop's first field and any other with a value
+  for station_id, fields in screen_fields.items():
+    if station_id in result['stale']:
+      for field in fields:
+        if field == fields[0] or values.get(field):
+          values[field] = mark_stale(values.get(field, ''), result['stale'][station_id])
+
+  template = get_template()
+  image = template.copy()  # 1-bit monochrome image with the static layer drawn
+  with phase('render'), metrics.timed('render'):
+    draw_fields(image, template, get_layout(), values, get_fonts(), font_color)
   return image
 
-if count == 0:
+def keep_frame(image, full=False, changed=0):
+  """Store image as the diff base for the next refresh."""
+  get_frame_store((WIDTH, HEIGHT)).commit(image.tobytes(), full, changed)
+  if save_png:
+    image.save(PNG_PATH)
+
+def power_down(epd):
+  """Put the panel into deep sleep and release SPI and GPIO, even after a failed refresh.
+
+  Left powered between refreshes the panel is damaged over time, and the next
+  init would open the SPI device again on top of the handle still held.
+  """
+  try:
+    epd.sleep()
+  except Exception as e:
+    print(f"Panel did not enter deep sleep: {e}")
+    from waveshare_epd import epdconfig
+    epdconfig.module_exit()
+
+def full_refresh(clean=False):
+  """Draw a complete frame, clearing the panel first when clean, returning the frame shown."""
+  latest_image = generate_image()
   if DEBUG:
-      # Save the image
-      generate_image().save("output.png")
-  else:
-      print("Initializing Display")
-      epd.init()
-      print("Display Initialized")
+    keep_frame(latest_image, full=True)
+    return latest_image
+
+  epd = get_epd()
+  try:
+    print("Initializing Display")
+    epd.init()
+    print("Display Initialized")
+    if clean:
+      # A second full waveform; only worth its flashing once ghosting has built up
       print("Clear Display")
       epd.Clear()
       print("Display Cleared")
-      latest_image = generate_image()
-      epd.display(epd.getbuffer(latest_image))
-      epd.sleep()
-
-      # Cache Image
-      latest_image.save("output.png")
-      count += 1
-      set_refresh_count(0)
-else:
-  kingsburyLatestArrivals = partial_refresh_api_call()
-  epd.init_part()
-  reuse_image = Image.open("output.png")
-  reused_draw = ImageDraw.Draw(reuse_image)
-  reused_draw.rectangle((5, 90, 600, 140), fill = background_color)
-  reused_draw.text((10, 95), "Stratford - " + str(kingsburyLatestArrivals['arrival_times']), font=font_small, fill=font_color)
-  reused_draw.text((10, 120), "Current Location - " + str(kingsburyLatestArrivals['current_location']), font=font_small, fill=font_color)
-  reuse_image.save("output.png")
-  epd.display_Partial(epd.getbuffer(reuse_image), 0, 0, WIDTH, HEIGHT)
-  set_refresh_count(0)
-
-print("Display Updated Successfully!")
+    epd.display(epd.getbuffer(latest_image))
+  finally:
+    power_down(epd)
+
+  keep_frame(latest_image, full=True)
+  return latest_image
+
+def partial_refresh(base_image):
+  """Draw a complete frame and send only the windows that differ from base_image, returning the frame shown."""
+  latest_image = generate_image()
+  if DEBUG:
+    keep_frame(latest_image)
+    return latest_image
+
+  # Inverting every byte for the panel does not change where frames differ,
+  # so the driver is only loaded when there is something to send
+  old, new = base_image.tobytes(), latest_image.tobytes()
+  regions = dirty_regions(old, new, WIDTH, HEIGHT)
+  if regions:
+    epd = get_epd()
+    new_buffer = epd.getbuffer(latest_image)
+    try:
+      epd.init_part()
+      for region in regions:
+        epd.display_Partial_window(new_buffer, *region)
+    finally:
+      power_down(epd)
+  keep_frame(latest_image, changed=changed_pixels(old, new) if regions else 0)
+  return latest_image
+
+def refresh(policy, base_image):
+  """Refresh the panel the way the policy chooses, returning the frame shown."""
+  global next_wake
+  store = get_frame_store((WIDTH, HEIGHT))
+  if DEBUG:
+    decision = Decision(FULL, "debug mode")
+  else:
+    decision = policy.decide(store.refresh_count, store.changed_pixels, store.last_full_refresh, base_image is not None)
+  now = time.time()
+  if service_hours is not None and not service_hours.in_service(now) and decision.kind != CLEAN:
+    # Nothing is running, so the panel keeps the frame that says when service resumes
+    next_wake = service_hours.next_start(now)
+    print(f"Outside service hours, next refresh at {datetime.fromtimestamp(next_wake):%H:%M}")
+    return base_image
+  print(f"{decision.kind.capitalize()} refresh: {decision.reason}")
+  failed = True
+  try:
+    with metrics.timed('cycle'):
+      image = partial_refresh(base_image) if decision.kind == PARTIAL else full_refresh(clean=decision.kind == CLEAN)
+    failed = False
+    return image
+  finally:
+    count_connection_stats()
+    metrics.finish_cycle(refresh=decision.kind, failed=failed)
+
+def run_once(policy):
+  """One cron tick, refreshing on top of the stored previous frame."""
+  refresh(policy, get_frame_store((WIDTH, HEIGHT)).image())
+
+def next_wakeup(policy, now):
+  """Epoch seconds the daemon should next wake."""
+  wake = next_wake if next_wake is not None and next_wake > now else now + refresh_interval
+  clean = policy.next_clean(now)
+  if service_hours is not None and clean is not None and clean < wake and not service_hours.in_service(clean):
+    # Service hours do not cover the cleaning refresh, so wake for it on its own
+    wake = clean
+  return wake
+
+def run_daemon(policy):
+  """Stay resident and refresh when the screen next changes.
+
+  Fonts, the EPD instance, the pooled HTTP session and the last frame are
+  kept in memory between cycles, so each tick only pays for the refresh itself.
+  Stops are polled in the background within the configured request budget,
+  and polling stops while the daemon sleeps through the hours without service.
+  """
+  global poller
+  poller = start_poller()
+  last_image = get_frame_store((WIDTH, HEIGHT)).image()
+  first_frame = True
+  while True:
+    try:
+      last_image = refresh(policy, last_image)
+      print("Display Updated Successfully!")
+      if first_frame:
+        startup_profile.report()
+        first_frame = False
+    except Exception as e:
+      print(f"Refresh failed: {e}")
+    now = time.time()
+    wake = next_wakeup(policy, now)
+    print(f"Next refresh at {datetime.fromtimestamp(wake):%H:%M:%S}")
+    # A cleaning refresh outside service hours does not need fresh arrivals,
+    # so polling stays paused until service resumes
+    resume = wake if service_hours is None else service_hours.next_start(wake)
+    if resume - now > refresh_interval:
+      poller.pause(resume - now - POLL_LEAD)
+    time.sleep(max(0, wake - time.time()))
+
+def parse_args(argv=None):
+  parser = argparse.ArgumentParser(description="London Underground & Bus e-paper display")
+  parser.add_argument('--daemon', action='store_true', help="stay resident and refresh on an internal schedule")
+  parser.add_argument('--full-interval', type=int, default=FULL_REFRESH_INTERVAL, help="longest gap in seconds between full refreshes")
+  parser.add_argument('--partial-interval', type=int, default=PARTIAL_REFRESH_INTERVAL,
+                      help="seconds between refreshes: the cron interval, or the longest gap in daemon mode")
+  parser.add_argument('--min-interval', type=int, default=MIN_INTERVAL, help="shortest gap in seconds between refreshes in daemon mode")
+  parser.add_argument('--quiet-hour', type=int, default=QUIET_HOUR, help="local hour of the daily cleaning refresh, -1 for none")
+  parser.add_argument('--save-png', action='store_true', help=f"also save each frame to {PNG_PATH} for debugging")
+  parser.add_argument('--startup-profile', action='store_true', help="report import and initialisation time per module after the first frame")
+  return parser.parse_args(argv)
+
+def main(argv=None):
+  global save_png, refresh_interval, min_interval
+  args = parse_args(argv)
+  save_png = save_png or args.save_png
+  refresh_interval = args.partial_interval
+  policy = RefreshPolicy(WIDTH * HEIGHT, max_age=args.full_interval, quiet_hour=args.quiet_hour if args.quiet_hour >= 0 else None)
+  if args.daemon:
+    min_interval = args.min_interval
+    run_daemon(policy)
+  else:
+    run_once(policy)
+    print("Display Updated Successfully!")
+    startup_profile.report()
+
+if __name__ == '__main__':
+  main()
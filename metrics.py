@@ -0,0 +1,192 @@
+"""Per-phase timings and counters for each refresh cycle.
+
+timed() and record() add seconds to a named phase, optionally for one
+source such as a stop, and count() adds to a counter. They can be called
+from any thread and accumulate until finish_cycle() closes the cycle.
+That appends the cycle to a JSON-lines log, together with the p50, p95
+and max of every phase over the last ROLLING_WINDOW cycles, and rewrites
+a Prometheus textfile-collector file with the same figures. A one-shot
+run restores the window from the tail of the log, so the rolling figures
+cover cron runs too.
+
+A phase with a source is stored as "phase:source", e.g. "fetch:940GZZLUKBY".
+"""
+import contextlib
+import functools
+import json
+import math
+import os
+import tempfile
+import threading
+import time
+from collections import deque
+
+METRICS_LOG = os.environ.get('METRICS_LOG', 'metrics.jsonl')
+METRICS_TEXTFILE = os.environ.get('METRICS_TEXTFILE', 'tubetracker.prom')
+ROLLING_WINDOW = 100        # cycles the percentiles are taken over
+PREFIX = 'tubetracker'
+TAIL_BYTES = 256 * 1024     # read from the end of the log to restore the window
+
+_lock = threading.Lock()
+_phases = {}                # "phase[:source]" -> seconds in the current cycle
+_counters = {}              # name -> count in the current cycle
+_window = None              # deque of the last cycles' phases, loaded on first use
+
+
+def record(phase, seconds, source=None):
+    """Add seconds to phase in the current cycle."""
+    key = phase if source is None else f"{phase}:{source}"
+    with _lock:
+        _phases[key] = _phases.get(key, 0.0) + seconds
+
+
+@contextlib.contextmanager
+def timed(phase, source=None):
+    """Time the block as part of phase."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record(phase, time.perf_counter() - start, source)
+
+
+def count(name, amount=1):
+    """Add amount to a counter in the current cycle."""
+    with _lock:
+        _counters[name] = _counters.get(name, 0) + amount
+
+
+def instrument(obj, method, phase, counter=None):
+    """Time every call of obj.method as phase, counting len(first argument) into counter."""
+    original = getattr(obj, method)
+
+    @functools.wraps(original)
+    def wrapper(*args, **kwargs):
+        if counter is not None and args:
+            count(counter, len(args[0]))
+        with timed(phase):
+            return original(*args, **kwargs)
+
+    setattr(obj, method, wrapper)
+
+
+def _percentile(values, fraction):
+    """Nearest-rank percentile of sorted values."""
+    return values[max(0, math.ceil(fraction * len(values)) - 1)]
+
+
+def _load_window(path):
+    window = deque(maxlen=ROLLING_WINDOW)
+    try:
+        with open(path, 'rb') as file:
+            file.seek(0, os.SEEK_END)
+            file.seek(max(0, file.tell() - TAIL_BYTES))
+            lines = file.read().splitlines()[-ROLLING_WINDOW:]
+    except OSError:
+        return window
+    for line in lines:
+        try:
+            window.append(json.loads(line)['phases_ms'])
+        except (ValueError, KeyError, TypeError):
+            continue  # a line cut by the tail read or a crash mid-write
+    return window
+
+
+def rolling(window):
+    """{phase: {'p50', 'p95', 'max'}} in ms over window."""
+    samples = {}
+    for phases in window:
+        for key, ms in phases.items():
+            samples.setdefault(key, []).append(ms)
+    summary = {}
+    for key, values in samples.items():
+        values.sort()
+        summary[key] = {
+            'p50': _percentile(values, 0.5),
+            'p95': _percentile(values, 0.95),
+            'max': values[-1],
+        }
+    return summary
+
+
+def _label(key):
+    phase, _, source = key.partition(':')
+    return f'phase="{phase}",source="{source}"' if source else f'phase="{phase}"'
+
+
+def prometheus_text(summary, phases, counters, finished):
+    """Textfile-collector exposition of the rolling figures and the last cycle.
+
+    The percentiles cover a sliding window, so they are gauges; a summary's
+    _sum and _count would have to be cumulative, which a window is not.
+    """
+    lines = []
+    for stat, description in (('p50', 'Median'), ('p95', '95th percentile'), ('max', 'Maximum')):
+        name = f"{PREFIX}_phase_{stat}_seconds"
+        lines += [
+            f"# HELP {name} {description} time per refresh phase over the last {ROLLING_WINDOW} cycles.",
+            f"# TYPE {name} gauge",
+        ]
+        lines += [f'{name}{{{_label(key)}}} {stats[stat] / 1000:.6f}' for key, stats in sorted(summary.items())]
+    lines += [
+        f"# HELP {PREFIX}_phase_last_seconds Time per phase in the last refresh cycle.",
+        f"# TYPE {PREFIX}_phase_last_seconds gauge",
+    ]
+    lines += [f'{PREFIX}_phase_last_seconds{{{_label(key)}}} {ms / 1000:.6f}' for key, ms in sorted(phases.items())]
+    lines += [
+        f"# HELP {PREFIX}_last_cycle Counters of the last refresh cycle: bytes transferred, cache hits and misses.",
+        f"# TYPE {PREFIX}_last_cycle gauge",
+    ]
+    lines += [f'{PREFIX}_last_cycle{{counter="{name}"}} {value}' for name, value in sorted(counters.items())]
+    lines += [
+        f"# HELP {PREFIX}_last_cycle_timestamp_seconds When the last refresh cycle finished.",
+        f"# TYPE {PREFIX}_last_cycle_timestamp_seconds gauge",
+        f"{PREFIX}_last_cycle_timestamp_seconds {finished:.3f}",
+    ]
+    return '\n'.join(lines) + '\n'
+
+
+def _write_atomic(path, text):
+    # The textfile collector may read at any moment, so it must never see a partial file
+    directory = os.path.dirname(os.path.abspath(path))
+    with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as file:
+        file.write(text)
+    os.chmod(file.name, 0o644)
+    os.replace(file.name, path)
+
+
+def finish_cycle(log_path=METRICS_LOG, textfile_path=METRICS_TEXTFILE, **info):
+    """Close the current cycle and write it out.
+
+    Args:
+        log_path (str): JSON-lines log appended to, or None.
+        textfile_path (str): Prometheus textfile rewritten, or None.
+        **info: Extra fields for the log line, e.g. the refresh kind.
+
+    Returns:
+        dict: The log line written.
+    """
+    global _window
+    with _lock:
+        phases = {key: round(seconds * 1000, 3) for key, seconds in _phases.items()}
+        counters = dict(_counters)
+        _phases.clear()
+        _counters.clear()
+        if _window is None:
+            _window = _load_window(log_path) if log_path else deque(maxlen=ROLLING_WINDOW)
+        _window.append(phases)
+        summary = rolling(_window)
+
+    finished = time.time()
+    entry = dict(info, time=round(finished, 3), phases_ms=phases, counters=counters,
+                 rolling_ms={key: {stat: round(value, 3) for stat, value in stats.items()}
+                             for key, stats in summary.items()})
+    try:
+        if log_path:
+            with open(log_path, 'a') as file:
+                file.write(json.dumps(entry, separators=(',', ':')) + '\n')
+        if textfile_path:
+            _write_atomic(textfile_path, prometheus_text(summary, phases, counters, finished))
+    except OSError as e:
+        print(f"Error writing metrics: {e}")
+    return entry
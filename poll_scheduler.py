@@ -0,0 +1,224 @@
+"""Background polling of many TfL sources within a request budget.
+
+Each source is a call that fetches one stop. Sources wait in a priority
+queue ordered by when they are next due. A token bucket holds the rate
+to the configured requests-per-minute quota. Between polls the display
+extrapolates countdowns locally, so a source is due again only after its
+interval or once its earliest prediction has lapsed, whichever is first.
+When more sources are due than the budget allows, on-screen sources and
+stops with an imminent arrival go first and the rest wait. A 429 response
+pauses all polling for the server's Retry-After, or an exponential
+backoff if it has none.
+"""
+import heapq
+import itertools
+import threading
+import time
+
+import requests
+
+from predictions import DUE_GRACE
+from tfl import timed_call
+
+IMMINENT_SECONDS = 180      # an arrival this close makes its stop urgent
+MIN_INTERVAL = 15           # never poll a stop more often than this
+OFF_SCREEN_FACTOR = 4       # stops not on screen are polled this much less often
+MAX_BACKOFF = 300           # seconds
+
+
+class TokenBucket:
+    """Allows per_minute requests a minute, with bursts of up to burst requests."""
+
+    def __init__(self, per_minute, burst=None, clock=time.monotonic):
+        self.rate = per_minute / 60.0
+        self.capacity = burst if burst is not None else max(1, min(per_minute, 10))
+        self.tokens = float(self.capacity)
+        self.clock = clock
+        self.updated = clock()
+
+    def _refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def take(self, now=None):
+        now = self.clock() if now is None else now
+        self._refill(now)
+        if self.tokens >= 1:
+            self.tokens -= 1
+            return True
+        return False
+
+    def wait_time(self, now=None):
+        """Seconds until a token is available."""
+        now = self.clock() if now is None else now
+        self._refill(now)
+        return 0.0 if self.tokens >= 1 else (1 - self.tokens) / self.rate
+
+
+class _Source:
+    __slots__ = ('key', 'call', 'interval', 'on_screen', 'next_due', 'failures', 'result', 'fetched_at')
+
+    def __init__(self, key, call, interval, on_screen, next_due):
+        self.key = key
+        self.call = call
+        self.interval = interval
+        self.on_screen = on_screen
+        self.next_due = next_due
+        self.failures = 0
+        self.result = None
+        self.fetched_at = None
+
+    def _earliest(self):
+        expected = [getattr(item, 'expected', None) for item in self.result or ()]
+        return min((e for e in expected if e is not None), default=None)
+
+    def imminent(self):
+        earliest = self._earliest()
+        return earliest is not None and earliest - time.time() <= IMMINENT_SECONDS
+
+    def priority(self):
+        return (2 if self.on_screen else 0) + (1 if self.imminent() else 0)
+
+    def poll_interval(self):
+        interval = self.interval if self.on_screen else self.interval * OFF_SCREEN_FACTOR
+        earliest = self._earliest()
+        if earliest is not None:
+            # The earliest train lapsing is the first thing local extrapolation cannot know
+            interval = min(interval, max(MIN_INTERVAL, earliest + DUE_GRACE - time.time()))
+        return interval
+
+
+class PollScheduler:
+    """Polls registered sources on their own cadence within a shared request budget.
+
+    Args:
+        requests_per_minute (int): Upstream request budget, e.g. the TfL API-key quota.
+        clock (callable): Monotonic clock, replaceable for testing.
+    """
+
+    def __init__(self, requests_per_minute=50, clock=time.monotonic):
+        self.clock = clock
+        self.bucket = TokenBucket(requests_per_minute, clock=clock)
+        self.paused_until = 0.0
+        self.throttled = 0      # 429 responses since the last successful poll
+        self._sources = {}
+        self._queue = []
+        self._seq = itertools.count()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def add(self, key, call, interval=60, on_screen=True):
+        """Register a source. call is (fn, *args) and is due immediately."""
+        source = _Source(key, call, interval, on_screen, self.clock())
+        with self._lock:
+            self._sources[key] = source
+            self._push(source)
+
+    def __contains__(self, key):
+        return key in self._sources
+
+    def set_on_screen(self, key, on_screen):
+        with self._lock:
+            self._sources[key].on_screen = on_screen
+
+    def snapshot(self):
+        """Return {key: latest result} for every source fetched at least once."""
+        with self._lock:
+            return {key: s.result for key, s in self._sources.items() if s.fetched_at is not None}
+
+    def stale(self, max_age):
+        """{key: age in seconds, None if never fetched} for results older than max_age seconds."""
+        now = self.clock()
+        with self._lock:
+            ages = {key: None if s.fetched_at is None else now - s.fetched_at for key, s in self._sources.items()}
+        return {key: age for key, age in ages.items() if age is None or age > max_age}
+
+    def _push(self, source):
+        heapq.heappush(self._queue, (source.next_due, next(self._seq), source.key))
+
+    def run_pending(self):
+        """Fetch the due sources the budget allows, most important first.
+
+        Returns:
+            int: Upstream requests made.
+        """
+        now = self.clock()
+        if now < self.paused_until:
+            return 0
+        with self._lock:
+            due = []
+            while self._queue and self._queue[0][0] <= now:
+                due.append(self._sources[heapq.heappop(self._queue)[2]])
+            due.sort(key=lambda s: (-s.priority(), s.next_due))
+
+        made = 0
+        for index, source in enumerate(due):
+            if not self.bucket.take(now):
+                self._defer(due[index:], now)
+                break
+            made += 1
+            try:
+                result = timed_call(source.key, source.call)
+            except requests.HTTPError as e:
+                if e.response is not None and e.response.status_code == 429:
+                    self._throttle(e.response, now)
+                    self._defer(due[index:], self.paused_until)
+                    break
+                self._failed(source, now)
+            except Exception:
+                self._failed(source, now)
+            else:
+                with self._lock:
+                    source.result = result
+                    source.fetched_at = self.clock()
+                    source.failures = 0
+                    self.throttled = 0
+                    source.next_due = now + source.poll_interval()
+                    self._push(source)
+        return made
+
+    def _defer(self, sources, until):
+        with self._lock:
+            for source in sources:
+                source.next_due = max(source.next_due, until)
+                self._push(source)
+
+    def _failed(self, source, now):
+        with self._lock:
+            source.failures += 1
+            source.next_due = now + min(source.poll_interval() * 2 ** source.failures, MAX_BACKOFF)
+            self._push(source)
+
+    def pause(self, seconds):
+        """Stop polling for seconds, e.g. outside service hours."""
+        self.paused_until = max(self.paused_until, self.clock() + seconds)
+
+    def _throttle(self, response, now):
+        self.throttled += 1
+        try:
+            delay = float(response.headers.get('Retry-After'))
+        except (TypeError, ValueError):
+            delay = min(2 ** self.throttled, MAX_BACKOFF)
+        self.paused_until = now + delay
+        print(f"TfL rate limit hit, pausing polling for {delay:.0f}s")
+
+    def next_wakeup(self):
+        """Seconds until run_pending() could do work."""
+        now = self.clock()
+        with self._lock:
+            next_due = self._queue[0][0] if self._queue else now + 60
+        return max(0.0, next_due - now, self.paused_until - now, self.bucket.wait_time(now))
+
+    def start(self):
+        """Poll in a daemon thread until stop() is called."""
+        self._thread = threading.Thread(target=self._run, name='tfl-poll', daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+
+    def _run(self):
+        while not self._stop.is_set():
+            self.run_pending()
+            self._stop.wait(min(max(self.next_wakeup(), 0.05), 5))
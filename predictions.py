@@ -0,0 +1,186 @@
+"""Last-known-good arrivals per stop, with countdowns carried forward by the local clock.
+
+Every Arrival carries its expected time, so between polls the countdown
+to each train is simply expected - now and "Due" follows from it. A stop
+only needs a real API call when its last poll is older than the freshness
+bound, or when one of its predictions has lapsed: the train should have
+left, and the response may not reach far enough ahead to replace it.
+
+A failed poll never replaces what a stop last returned. The refresh is
+served from the stored arrivals while the poll runs in the background;
+it only waits briefly for the answer, and longer only for a stop with
+nothing stored yet. A poll that finishes late lands in the store for the
+next refresh. After repeated failures a stop's circuit opens and it is
+not polled again until a cooldown has passed, which doubles each time
+the retry fails too.
+
+PredictionStore persists all of this to a small JSON file so one-shot
+cron runs share it.
+"""
+import concurrent.futures
+import json
+import os
+import tempfile
+import threading
+import time
+
+from tfl import FETCH_DEADLINE, Arrival, start_calls
+
+PREDICTIONS_PATH = os.environ.get('PREDICTIONS_FILE', 'predictions.json')
+FRESH_FOR = 120             # seconds a poll's predictions are trusted without a lapse
+DUE_GRACE = 30              # seconds a train stays "Due" past its expected time
+REVALIDATE_WAIT = 3         # seconds a refresh waits for polls of stops it has data for
+BREAKER_FAILURES = 3        # consecutive failures that open a stop's circuit
+BREAKER_COOLDOWN = 60       # seconds an open circuit first waits before a retry
+MAX_COOLDOWN = 30 * 60      # seconds
+
+
+def advance(arrivals, now=None):
+    """Arrivals as they stand at now: countdowns from the local clock, departed trains dropped."""
+    now = time.time() if now is None else now
+    return [
+        arrival._replace(time_to_station=max(0, int(arrival.expected - now)))
+        for arrival in arrivals
+        if arrival.expected >= now - DUE_GRACE
+    ]
+
+
+def next_lapse(arrivals):
+    """Epoch seconds when the earliest prediction lapses, or None."""
+    earliest = min((arrival.expected for arrival in arrivals), default=None)
+    return None if earliest is None else earliest + DUE_GRACE
+
+
+class _Stop:
+    __slots__ = ('fetched_at', 'arrivals', 'failures', 'retry_at')
+
+    def __init__(self, fetched_at=None, arrivals=None, failures=0, retry_at=0.0):
+        self.fetched_at = fetched_at
+        self.arrivals = arrivals
+        self.failures = failures
+        self.retry_at = retry_at
+
+
+class PredictionStore:
+    """Last-known-good arrivals per stop and the circuit breaker in front of each.
+
+    Args:
+        path (str): JSON file persisting the store, or None to keep it in memory.
+        fresh_for (float): Seconds before a stop's predictions need a new poll.
+    """
+
+    def __init__(self, path=PREDICTIONS_PATH, fresh_for=FRESH_FOR):
+        self.path = path
+        self.fresh_for = fresh_for
+        self._stops = None  # key -> _Stop, loaded on first use
+        self._lock = threading.RLock()
+
+    def _entries(self):
+        if self._stops is None:
+            self._stops = {}
+            if self.path:
+                try:
+                    with open(self.path, 'r') as file:
+                        data = json.load(file)
+                    self._stops = {
+                        key: _Stop(fetched_at, arrivals and [Arrival(*fields) for fields in arrivals], failures, retry_at)
+                        for key, (fetched_at, arrivals, failures, retry_at) in data.items()
+                    }
+                except (OSError, ValueError, TypeError):
+                    pass
+        return self._stops
+
+    def _stop(self, key):
+        with self._lock:
+            stops = self._entries()
+            if key not in stops:
+                stops[key] = _Stop()
+            return stops[key]
+
+    def needs_poll(self, key, now=None):
+        """Whether key's predictions are missing, too old, or have a lapsed train, and may be polled."""
+        now = time.time() if now is None else now
+        stop = self._stop(key)
+        if now < stop.retry_at:
+            return False
+        if stop.arrivals is None:
+            return True
+        lapse = next_lapse(stop.arrivals)
+        return now - stop.fetched_at >= self.fresh_for or (lapse is not None and now >= lapse)
+
+    def update(self, results, now=None):
+        """Record {key: arrivals} fetched at now and persist the store."""
+        if not results:
+            return
+        now = time.time() if now is None else now
+        with self._lock:
+            for key, arrivals in results.items():
+                stop = self._stop(key)
+                stop.fetched_at, stop.arrivals = now, list(arrivals)
+                stop.failures, stop.retry_at = 0, 0.0
+            self._save()
+
+    def failed(self, key, error=None, now=None):
+        """Count a failed poll of key, opening its circuit after repeated failures."""
+        now = time.time() if now is None else now
+        with self._lock:
+            stop = self._stop(key)
+            stop.failures += 1
+            if stop.failures >= BREAKER_FAILURES:
+                cooldown = min(BREAKER_COOLDOWN * 2 ** (stop.failures - BREAKER_FAILURES), MAX_COOLDOWN)
+                stop.retry_at = now + cooldown
+                print(f"{key} failed {stop.failures} times ({type(error).__name__}), not polling it for {cooldown:.0f}s")
+            self._save()
+
+    def _poll(self, key, call):
+        """Run call on a fetch worker, storing its result or failure before the poll completes."""
+        try:
+            arrivals = call[0](*call[1:])
+        except Exception as e:
+            self.failed(key, e)
+            raise
+        self.update({key: arrivals})
+        return arrivals
+
+    def revalidate(self, calls, wait=REVALIDATE_WAIT):
+        """Poll {key: (fn, *args)} in the background, waiting a little for the answers.
+
+        Stops with nothing stored are waited for up to FETCH_DEADLINE, as
+        there is nothing else to show for them; the rest up to wait seconds.
+        Polls still running afterwards update the store when they finish.
+        """
+        if not calls:
+            return
+        if any(self._stop(key).arrivals is None for key in calls):
+            wait = max(wait, FETCH_DEADLINE)
+        # Each poll stores its own answer, so whatever finished is in the store once wait() returns
+        futures = start_calls({key: (self._poll, key, call) for key, call in calls.items()})
+        concurrent.futures.wait(futures.values(), timeout=wait)
+
+    def current(self, keys, now=None):
+        """{key: arrivals advanced to now} for every key with stored predictions."""
+        stops = self._entries()
+        return {key: advance(stops[key].arrivals, now) for key in keys if key in stops and stops[key].arrivals is not None}
+
+    def stale(self, keys, max_age, now=None):
+        """{key: age in seconds, None if never fetched} for keys older than max_age."""
+        now = time.time() if now is None else now
+        ages = {}
+        for key in keys:
+            stop = self._stop(key)
+            age = None if stop.fetched_at is None else now - stop.fetched_at
+            if age is None or age > max_age:
+                ages[key] = age
+        return ages
+
+    def _save(self):
+        if not self.path:
+            return
+        try:
+            directory = os.path.dirname(os.path.abspath(self.path))
+            data = {key: [stop.fetched_at, stop.arrivals, stop.failures, stop.retry_at] for key, stop in self._stops.items()}
+            with tempfile.NamedTemporaryFile('w', dir=directory, delete=False) as file:
+                json.dump(data, file)
+            os.replace(file.name, self.path)
+        except OSError as e:
+            print(f"Error saving predictions: {e}")
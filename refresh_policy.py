@@ -0,0 +1,92 @@
+"""Choose between a partial, a full and a cleaning full refresh.
+
+Partial refreshes are fast and do not flash, but every one leaves a little
+ghosting behind, roughly in proportion to the pixels it changed. The
+policy keeps to partial refreshes until the damage since the last full
+refresh crosses a threshold: too many partial refreshes, too many changed
+pixels, or too long since the panel was fully driven. Once a day, at the
+quiet hour, it asks for a cleaning refresh that clears the panel first.
+Each decision carries the reason, so thresholds can be tuned from the log.
+"""
+import time
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+PARTIAL = 'partial'
+FULL = 'full'
+CLEAN = 'clean'     # full refresh that clears the panel first
+
+MAX_PARTIALS = 20
+MAX_CHANGED_FRACTION = 0.5      # of the panel's pixels, summed over partial refreshes
+MAX_AGE = 4 * 60 * 60           # seconds since the last full refresh
+QUIET_HOUR = 3                  # local hour for the daily cleaning refresh, None for never
+
+
+class Decision(NamedTuple):
+    kind: str
+    reason: str
+
+
+class RefreshPolicy:
+    """Ghosting thresholds for the panel.
+
+    Args:
+        pixels (int): Pixels on the panel.
+        max_partials (int): Partial refreshes allowed between full ones.
+        max_changed_fraction (float): Changed pixels allowed between full
+            refreshes, as a fraction of the panel.
+        max_age (float): Seconds allowed between full refreshes.
+        quiet_hour (int): Local hour of the daily cleaning refresh, or None.
+    """
+
+    def __init__(self, pixels, max_partials=MAX_PARTIALS, max_changed_fraction=MAX_CHANGED_FRACTION,
+                 max_age=MAX_AGE, quiet_hour=QUIET_HOUR):
+        self.pixels = pixels
+        self.max_partials = max_partials
+        self.max_changed = int(pixels * max_changed_fraction)
+        self.max_age = max_age
+        self.quiet_hour = quiet_hour
+
+    def decide(self, partials, changed, last_full, have_frame=True, now=None):
+        """Pick the refresh for this tick.
+
+        Args:
+            partials (int): Partial refreshes since the last full refresh.
+            changed (int): Pixels they changed in total.
+            last_full (float): Epoch seconds of the last full refresh, 0 if unknown.
+            have_frame (bool): Whether the frame on the panel is known.
+            now (float): Epoch seconds, defaults to the current time.
+
+        Returns:
+            Decision: The refresh kind and why it was chosen.
+        """
+        now = time.time() if now is None else now
+        if not have_frame or not last_full:
+            return Decision(FULL, "no previous frame to update")
+
+        age = now - last_full
+        if self.quiet_hour is not None:
+            local = datetime.fromtimestamp(now)
+            quiet_start = local.replace(hour=self.quiet_hour, minute=0, second=0, microsecond=0)
+            if local.hour == self.quiet_hour and last_full < quiet_start.timestamp():
+                return Decision(CLEAN, f"quiet hour {self.quiet_hour:02d}:00")
+        if partials >= self.max_partials:
+            return Decision(FULL, f"{partials} partial refreshes since the last full one (limit {self.max_partials})")
+        if changed >= self.max_changed:
+            return Decision(FULL, f"{changed / self.pixels:.0%} of the panel changed since the last full refresh "
+                                  f"(limit {self.max_changed / self.pixels:.0%})")
+        if age >= self.max_age:
+            return Decision(FULL, f"{timedelta(seconds=int(age))} since the last full refresh (limit {timedelta(seconds=int(self.max_age))})")
+        return Decision(PARTIAL, f"{partials}/{self.max_partials} partials, {changed / self.pixels:.1%} changed, "
+                                 f"{timedelta(seconds=int(age))} since the last full refresh")
+
+    def next_clean(self, now=None):
+        """Epoch seconds the next quiet hour starts, or None without one."""
+        if self.quiet_hour is None:
+            return None
+        now = time.time() if now is None else now
+        local = datetime.fromtimestamp(now)
+        start = local.replace(hour=self.quiet_hour, minute=0, second=0, microsecond=0)
+        if start <= local:
+            start += timedelta(days=1)
+        return start.timestamp()
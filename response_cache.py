@@ -0,0 +1,198 @@
+"""HTTP response cache for TfL API bodies, keyed by URL.
+
+Entries honour the server's Cache-Control max-age and keep the ETag and
+Last-Modified validators so stale entries can be revalidated with a
+conditional request instead of downloading the body again. An in-memory
+LRU tier is backed by an optional directory of JSON files that survives
+process restarts.
+"""
+import hashlib
+import json
+import os
+import re
+import tempfile
+import threading
+import time
+from collections import OrderedDict
+
+_MAX_AGE = re.compile(r'(?:^|,)\s*max-age\s*=\s*"?(\d+)"?', re.IGNORECASE)
+_NO_CACHE = re.compile(r'(?:^|,)\s*(?:no-cache|no-store)\b', re.IGNORECASE)
+
+
+def freshness_lifetime(headers):
+    """Return how many seconds a response stays fresh according to its headers."""
+    cache_control = headers.get('Cache-Control', '')
+    if _NO_CACHE.search(cache_control):
+        return 0
+    match = _MAX_AGE.search(cache_control)
+    if not match:
+        return 0
+    try:
+        age = int(headers.get('Age', 0))
+    except ValueError:
+        age = 0
+    return max(int(match.group(1)) - age, 0)
+
+
+class CachedResponse:
+    __slots__ = ('url', 'body', 'etag', 'last_modified', 'stored_at', 'expires_at')
+
+    def __init__(self, url, body, etag=None, last_modified=None, stored_at=None, expires_at=None):
+        self.url = url
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.stored_at = time.time() if stored_at is None else stored_at
+        self.expires_at = self.stored_at if expires_at is None else expires_at
+
+    def is_fresh(self, max_age=None, now=None):
+        """Whether the body can be served without asking the server.
+
+        Args:
+            max_age (float, optional): Caller override of the server's freshness
+                lifetime, in seconds since the body was stored.
+        """
+        now = time.time() if now is None else now
+        if max_age is not None:
+            return now - self.stored_at <= max_age
+        return now < self.expires_at
+
+    def validators(self):
+        """Headers for a conditional request revalidating this entry."""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def to_dict(self):
+        return {
+            'url': self.url,
+            'body': self.body.decode('utf-8'),
+            'etag': self.etag,
+            'last_modified': self.last_modified,
+            'stored_at': self.stored_at,
+            'expires_at': self.expires_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(
+            data['url'],
+            data['body'].encode('utf-8'),
+            data.get('etag'),
+            data.get('last_modified'),
+            data['stored_at'],
+            data['expires_at'],
+        )
+
+
+class ResponseCache:
+    """Two-tier (memory LRU, optional disk) store of response bodies.
+
+    Args:
+        max_entries (int): Entries kept in memory before the least recently
+            used is dropped.
+        cache_dir (str, optional): Directory for the on-disk tier. Disabled
+            when None.
+    """
+
+    def __init__(self, max_entries=64, cache_dir=None):
+        self.max_entries = max_entries
+        self.cache_dir = cache_dir
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats = {'hits': 0, 'misses': 0, 'revalidated': 0, 'disk_loads': 0}
+        if cache_dir:
+            os.makedirs(cache_dir, exist_ok=True)
+
+    def get(self, url):
+        """Return the CachedResponse for url, fresh or not, or None."""
+        with self._lock:
+            entry = self._entries.get(url)
+            if entry is not None:
+                self._entries.move_to_end(url)
+                return entry
+        entry = self._load(url)
+        if entry is not None:
+            with self._lock:
+                self._stats['disk_loads'] += 1
+                self._remember(entry)
+        return entry
+
+    def store(self, url, body, headers):
+        """Cache a 200 response body and its validators."""
+        now = time.time()
+        entry = CachedResponse(
+            url,
+            body,
+            headers.get('ETag'),
+            headers.get('Last-Modified'),
+            now,
+            now + freshness_lifetime(headers),
+        )
+        with self._lock:
+            self._remember(entry)
+        self._save(entry)
+        return entry
+
+    def revalidated(self, entry, headers):
+        """Extend an entry after the server answered 304 Not Modified."""
+        now = time.time()
+        entry.stored_at = now
+        entry.expires_at = now + freshness_lifetime(headers)
+        entry.etag = headers.get('ETag', entry.etag)
+        with self._lock:
+            self._stats['revalidated'] += 1
+        self._save(entry)
+
+    def record(self, hit):
+        with self._lock:
+            self._stats['hits' if hit else 'misses'] += 1
+
+    def stats(self):
+        """Return hit/miss counters and the hit ratio."""
+        with self._lock:
+            stats = dict(self._stats)
+        lookups = stats['hits'] + stats['misses']
+        stats['hit_ratio'] = stats['hits'] / lookups if lookups else 0.0
+        return stats
+
+    def _remember(self, entry):
+        self._entries[entry.url] = entry
+        self._entries.move_to_end(entry.url)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _path(self, url):
+        return os.path.join(self.cache_dir, hashlib.sha1(url.encode('utf-8')).hexdigest() + '.json')
+
+    def _load(self, url):
+        if not self.cache_dir:
+            return None
+        try:
+            with open(self._path(url), 'r') as file:
+                return CachedResponse.from_dict(json.load(file))
+        except (OSError, ValueError, KeyError):
+            return None
+
+    def _save(self, entry):
+        if not self.cache_dir:
+            return
+        try:
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        except OSError as e:
+            print(f"Error writing response cache: {e}")
+            return
+        try:
+            with os.fdopen(fd, 'w') as file:
+                json.dump(entry.to_dict(), file)
+            os.replace(tmp_path, self._path(entry.url))
+        except (OSError, ValueError) as e:
+            # UnicodeDecodeError is a ValueError: a body or header that does not serialise
+            print(f"Error writing response cache: {e}")
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
@@ -0,0 +1,114 @@
+"""Where a cold start spends its time, for --startup-profile.
+
+install() times every module imported from then on, and phase() times
+named initialisation steps. report() prints the import time spent in
+each top-level package, slowest first, followed by the phases in order. When
+profiling is not installed, phase() costs next to nothing.
+"""
+import contextlib
+import sys
+import time
+
+_profiler = None
+
+
+class _TimedLoader:
+    """Wraps a module loader to time the module's execution."""
+
+    def __init__(self, loader, name, profiler):
+        self._loader = loader
+        self._name = name
+        self._profiler = profiler
+
+    def __getattr__(self, name):
+        return getattr(self._loader, name)
+
+    def create_module(self, spec):
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module):
+        spec = getattr(module, '__spec__', None)
+        if spec is not None and spec.loader is self:
+            # Code that inspects the loader should see the real one
+            spec.loader = module.__loader__ = self._loader
+        with self._profiler.timing(self._name):
+            self._loader.exec_module(module)
+
+
+class ImportProfiler:
+    """Meta path finder recording how long each module takes to import."""
+
+    def __init__(self):
+        self.started = time.perf_counter()
+        self.imports = {}   # name -> (cumulative, self) seconds
+        self.phases = []    # (name, seconds) in the order they ran
+        self._nested = []
+
+    def find_spec(self, fullname, path, target=None):
+        for finder in sys.meta_path:
+            if finder is self or not hasattr(finder, 'find_spec'):
+                continue
+            spec = finder.find_spec(fullname, path, target)
+            if spec is None:
+                continue
+            if spec.loader is not None and hasattr(spec.loader, 'exec_module'):
+                spec.loader = _TimedLoader(spec.loader, fullname, self)
+            return spec
+        return None
+
+    @contextlib.contextmanager
+    def timing(self, name):
+        start = time.perf_counter()
+        self._nested.append(0.0)
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            nested = self._nested.pop()
+            if self._nested:
+                self._nested[-1] += elapsed
+            self.imports[name] = (elapsed, elapsed - nested)
+
+
+def install():
+    """Start timing imports and phases."""
+    global _profiler
+    if _profiler is None:
+        _profiler = ImportProfiler()
+        sys.meta_path.insert(0, _profiler)
+    return _profiler
+
+
+@contextlib.contextmanager
+def phase(name):
+    """Time an initialisation step when profiling is installed."""
+    if _profiler is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        _profiler.phases.append((name, time.perf_counter() - start))
+
+
+def report(limit=15):
+    """Print import time per top-level package, slowest first, then every phase."""
+    if _profiler is None:
+        return
+    total = time.perf_counter() - _profiler.started
+    packages = {}
+    for name, (cumulative, own) in _profiler.imports.items():
+        package = name.partition('.')[0]
+        count, spent = packages.get(package, (0, 0.0))
+        packages[package] = (count + 1, spent + own)
+    slowest = sorted(packages.items(), key=lambda item: item[1][1], reverse=True)
+
+    print(f"Startup profile: {total * 1000:.1f} ms since profiling began")
+    print(f"  {len(_profiler.imports)} modules imported in {sum(own for _, own in _profiler.imports.values()) * 1000:.1f} ms")
+    print(f"  {'package':32} {'modules':>8} {'ms':>8}")
+    for package, (count, spent) in slowest[:limit]:
+        print(f"  {package:32} {count:8} {spent * 1000:8.1f}")
+    print(f"  {'phase':32} {'':>8} {'ms':>8}")
+    for name, elapsed in _profiler.phases:
+        print(f"  {name:32} {'':>8} {elapsed * 1000:8.1f}")
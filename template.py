@@ -0,0 +1,71 @@
+"""Static layer of the display, rendered once and reused by every refresh.
+
+Titles, section headers, field labels and dividers never change between
+refreshes, so they are rasterised a single time into a 1-bpp template.
+The template is kept in memory and persisted as raw bytes under a key
+hashing the fonts and the layout, so a changed layout or font simply
+renders a new one.
+"""
+import hashlib
+import os
+
+from PIL import Image, ImageDraw
+
+TEMPLATE_CACHE_DIR = os.environ.get('TEMPLATE_CACHE_DIR', '.cache')
+
+_templates = {}
+
+
+def template_key(font_path, font_sizes, static_text, dividers, size):
+    """Hash everything that affects the rendered template."""
+    try:
+        stat = os.stat(font_path)
+        font_id = (font_path, stat.st_size, stat.st_mtime_ns)
+    except OSError:
+        font_id = (font_path,)
+    spec = repr((font_id, sorted(font_sizes.items()), static_text, dividers, size))
+    return hashlib.sha1(spec.encode('utf-8')).hexdigest()[:16]
+
+
+def render_template(fonts, static_text, dividers, size, background=255, color=0):
+    """Draw the static text and dividers onto a blank 1-bpp image."""
+    image = Image.new("1", size, background)
+    draw = ImageDraw.Draw(image)
+    for position, text, font_name in static_text:
+        draw.text(position, text, font=fonts[font_name], fill=color)
+    for line, width in dividers:
+        draw.line(line, fill=color, width=width)
+    return image
+
+
+def load_template(font_path, fonts, font_sizes, static_text, dividers, size):
+    """Return the template for this layout from memory, disk, or a fresh render.
+
+    Callers must copy() the result before drawing on it.
+    """
+    key = template_key(font_path, font_sizes, static_text, dividers, size)
+    template = _templates.get(key)
+    if template is not None:
+        return template
+
+    path = os.path.join(TEMPLATE_CACHE_DIR, f"template-{key}.bin")
+    try:
+        with open(path, 'rb') as file:
+            template = Image.frombytes("1", size, file.read())
+    except (OSError, ValueError):
+        template = render_template(fonts, static_text, dividers, size)
+        _save(path, template)
+
+    _templates[key] = template
+    return template
+
+
+def _save(path, template):
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + '.tmp'
+        with open(tmp_path, 'wb') as file:
+            file.write(template.tobytes())
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Error saving layout template: {e}")
@@ -1,47 +1,253 @@
+import calendar
 import concurrent.futures
+import os
+import time
 import requests
+from requests.adapters import HTTPAdapter
 from datetime import datetime
+from typing import NamedTuple, Optional
+from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
+import metrics
+from json_stream import iter_array, iter_bytes
+from response_cache import ResponseCache
 
-# Helper functions
-def get_station_arrivals(station_id):
-    """Fetch station arrival data with error handling."""
-    headers = {'Cache-Control': 'no-cache'}
-    url = f"https://api.tfl.gov.uk/StopPoint/{station_id}/Arrivals"
+API_BASE = os.environ.get('TFL_API_BASE', 'https://api.tfl.gov.uk')
+
+# TfL timestamps are UTC; the board shows London wall-clock time
+try:
+    LONDON = ZoneInfo('Europe/London')
+except ZoneInfoNotFoundError:
+    LONDON = None  # fall back to the system's local time
+
+# Shared HTTP client
+POOL_CONNECTIONS = 2          # distinct hosts kept in the pool
+POOL_MAXSIZE = 8              # keep-alive connections per host
+REQUEST_TIMEOUT = (3.05, 10)  # (connect, read) seconds
+FETCH_DEADLINE = 12           # seconds a refresh waits for all of its sources
+STREAM_CHUNK = 16384          # bytes decoded at a time from a response body
+DUE_WITHIN = 60               # seconds to arrival shown as "Due"
+
+_adapter = HTTPAdapter(pool_connections=POOL_CONNECTIONS, pool_maxsize=POOL_MAXSIZE, pool_block=True)
+session = requests.Session()
+session.mount('https://', _adapter)
+session.mount('http://', _adapter)
+
+# A TfL API key raises the request quota; it is sent with every request
+if os.environ.get('TFL_APP_KEY'):
+    session.params = {'app_key': os.environ['TFL_APP_KEY']}
+
+# Persistent fetch workers, one per pooled connection, shared by every refresh
+_executor = concurrent.futures.ThreadPoolExecutor(max_workers=POOL_MAXSIZE, thread_name_prefix='tfl-fetch')
+
+def get_connection_stats():
+    """Return how many requests reused a pooled connection versus opened a new one."""
+    opened = requests_sent = 0
+    pools = _adapter.poolmanager.pools
+    for key in list(pools.keys()):
+        pool = pools.get(key)
+        if pool is None:
+            continue
+        opened += pool.num_connections
+        requests_sent += pool.num_requests
+    return {'requests': requests_sent, 'opened': opened, 'reused': max(requests_sent - opened, 0)}
+
+CONNECTION_COUNTERS = {'requests': 'http_requests', 'opened': 'connections_opened', 'reused': 'connections_reused'}
+_counted_connections = dict.fromkeys(CONNECTION_COUNTERS, 0)
+
+def count_connection_stats():
+    """Add the requests, new connections and reused ones since the last call to the cycle's metrics."""
+    for name, total in get_connection_stats().items():
+        # A pool evicted from the manager takes its counts with it, so totals can drop
+        metrics.count(CONNECTION_COUNTERS[name], max(total - _counted_connections[name], 0))
+        _counted_connections[name] = total
+
+# Response cache: memory LRU, plus a disk tier when TFL_CACHE_DIR is set
+response_cache = ResponseCache(max_entries=64, cache_dir=os.environ.get('TFL_CACHE_DIR'))
+
+def get_cache_stats():
+    """Return response cache hit/miss statistics."""
+    return response_cache.stats()
+
+def fetch_chunks(url, max_age=None):
+    """Yield the response body for url in chunks, served from the cache while fresh.
+
+    max_age overrides the server's freshness lifetime for this call; 0 always
+    goes to the server. Stale entries are revalidated with their ETag.
+    """
+    cached = response_cache.get(url)
+    if cached is not None and max_age != 0 and cached.is_fresh(max_age):
+        response_cache.record(hit=True)
+        metrics.count('cache_hits')
+        yield from iter_bytes(cached.body, STREAM_CHUNK)
+        return
+    response_cache.record(hit=False)
+    metrics.count('cache_misses')
+
+    headers = cached.validators() if cached is not None else {}
+    if max_age == 0:
+        headers['Cache-Control'] = 'no-cache'
+    response = session.get(url, headers=headers, timeout=REQUEST_TIMEOUT, stream=True)
     try:
-        response = requests.get(url, headers=headers)
+        if response.status_code == 304 and cached is not None:
+            response_cache.revalidated(cached, response.headers)
+            metrics.count('cache_revalidated')
+            yield from iter_bytes(cached.body, STREAM_CHUNK)
+            return
         response.raise_for_status()
-        return response.json()
-    except requests.RequestException as e:
+        parts = []
+        for chunk in response.iter_content(STREAM_CHUNK):
+            parts.append(chunk)
+            metrics.count('http_bytes', len(chunk))
+            yield chunk
+        response_cache.store(url, b''.join(parts), response.headers)
+    finally:
+        response.close()
+
+def fetch(url, max_age=None):
+    """Return the whole response body for url, served from the cache while fresh."""
+    return b''.join(fetch_chunks(url, max_age))
+
+# Parsed arrivals
+class Arrival(NamedTuple):
+    """The fields of a TfL arrival prediction the board uses."""
+    platform: str
+    line: str
+    destination: str
+    expected: int                    # expected arrival, epoch seconds
+    time_to_station: int             # seconds, as predicted when fetched
+    vehicle_id: Optional[str]
+    current_location: Optional[str]
+
+def parse_timestamp(value):
+    """Epoch seconds of a TfL 'YYYY-MM-DDTHH:MM:SS[.fff]Z' UTC timestamp."""
+    return calendar.timegm((
+        int(value[0:4]), int(value[5:7]), int(value[8:10]),
+        int(value[11:13]), int(value[14:16]), int(value[17:19]),
+    ))
+
+def parse_arrival(raw):
+    return Arrival(
+        raw.get('platformName'),
+        raw.get('lineId'),
+        raw.get('destinationName') or raw.get('towards', 'Unknown Destination'),
+        parse_timestamp(raw['expectedArrival']),
+        raw['timeToStation'],
+        raw.get('vehicleId'),
+        raw.get('currentLocation'),
+    )
+
+def parse_arrivals(payload):
+    """Decode a TfL arrivals payload into Arrival records, once per response."""
+    return [parse_arrival(raw) for raw in payload]
+
+# Helper functions
+def stop_arrivals_url(station_id, line_ids=None):
+    """URL of a stop's arrivals, scoped to line_ids when given."""
+    if line_ids:
+        return f"{API_BASE}/Line/{','.join(sorted(line_ids))}/Arrivals/{station_id}"
+    return f"{API_BASE}/StopPoint/{station_id}/Arrivals"
+
+def fetch_arrivals(url, max_age=None, platforms=None, lines=None):
+    """Stream-decode an arrivals URL into Arrival records, raising on failure.
+
+    Predictions are decoded one at a time as the body arrives. When platforms
+    or lines are given, only predictions on one of those platforms or lines
+    are kept, so memory follows what is displayed rather than the stop's traffic.
+    """
+    filtered = platforms is not None or lines is not None
+    platforms = platforms or ()
+    lines = lines or ()
+    waited = [0.0]
+    start = time.perf_counter()
+    arrivals = [
+        parse_arrival(raw)
+        for raw in iter_array(_timed_chunks(fetch_chunks(url, max_age), waited))
+        if not filtered or raw.get('platformName') in platforms or raw.get('lineId') in lines
+    ]
+    # Decoding is interleaved with the download; whatever was not spent waiting for chunks was parsing
+    metrics.record('http', waited[0])
+    metrics.record('parse', time.perf_counter() - start - waited[0])
+    return arrivals
+
+def _timed_chunks(chunks, waited):
+    """Yield from chunks, adding the time spent waiting for each to waited[0]."""
+    while True:
+        start = time.perf_counter()
+        chunk = next(chunks, None)
+        waited[0] += time.perf_counter() - start
+        if chunk is None:
+            return
+        yield chunk
+
+def get_arrivals(url, max_age=None, platforms=None, lines=None):
+    """Fetch and decode an arrivals URL with error handling."""
+    try:
+        return fetch_arrivals(url, max_age, platforms, lines)
+    except (requests.RequestException, ValueError, KeyError) as e:
         return []
 
+def timed_call(key, call):
+    """Run call, timing it as the fetch phase of key."""
+    with metrics.timed('fetch', key):
+        return call[0](*call[1:])
+
+def start_calls(calls):
+    """Submit {key: (fn, *args)} to the shared workers, returning {key: future}."""
+    return {key: _executor.submit(timed_call, key, call) for key, call in calls.items()}
+
+def run_before_deadline(calls, deadline=FETCH_DEADLINE):
+    """Run {key: (fn, *args)} in parallel on the shared workers.
+
+    Returns ({key: result}, stale) with every call that finished within
+    deadline seconds; stale is the set of keys that failed or ran late.
+    """
+    futures = start_calls(calls)
+    done, _ = concurrent.futures.wait(futures.values(), timeout=deadline)
+    results, stale = {}, set()
+    for key, future in futures.items():
+        if future not in done:
+            future.cancel()
+            stale.add(key)
+            print(f"Timed out fetching data for {key}")
+            continue
+        try:
+            results[key] = future.result()
+        except Exception as exc:
+            stale.add(key)
+            print(f"Error fetching data for {key}: {exc}")
+    return results, stale
+
+def get_station_arrivals(station_id, max_age=None):
+    """Fetch station arrival data with error handling."""
+    return get_arrivals(stop_arrivals_url(station_id), max_age)
+
 def format_time_to_station(seconds, expected_arrival):
-    """Format time to station into a readable format."""
-    if seconds < 60:
+    """Format time to station into a readable format.
+
+    expected_arrival is epoch seconds, or a TfL ISO timestamp.
+    """
+    if seconds < DUE_WITHIN:
         return "Due"
-    dt = datetime.strptime(expected_arrival, '%Y-%m-%dT%H:%M:%SZ')
-    return dt.strftime('%H:%M')
+    if isinstance(expected_arrival, str):
+        expected_arrival = parse_timestamp(expected_arrival)
+    return datetime.fromtimestamp(expected_arrival, LONDON).strftime('%H:%M')
+
+def format_arrival(arrival):
+    return format_time_to_station(arrival.time_to_station, arrival.expected)
 
 def group_arrivals_by_platform(arrivals, platform_name):
     """Filter and sort arrivals by platform."""
     return sorted(
-        [
-            {
-                **arrival,
-                'formattedTime': format_time_to_station(arrival['timeToStation'], arrival['expectedArrival'])
-            }
-            for arrival in arrivals if arrival.get('platformName') == platform_name
-        ],
-        key=lambda x: x['expectedArrival']
+        (arrival for arrival in arrivals if arrival.platform == platform_name),
+        key=lambda arrival: arrival.expected
     )
 
 def group_arrivals_by_line(arrivals, line_ids):
     """Group arrivals by line ID and format times."""
     results = {line_id: [] for line_id in line_ids}
     for arrival in arrivals:
-        line_id = arrival.get('lineId')
-        if line_id in line_ids:
-            formatted_time = format_time_to_station(arrival['timeToStation'], arrival['expectedArrival'])
-            results[line_id].append((arrival['timeToStation'], formatted_time))
+        if arrival.line in results:
+            results[arrival.line].append((arrival.time_to_station, format_arrival(arrival)))
 
     # Sort and format results
     for line_id, times in results.items():
@@ -50,51 +256,114 @@ def group_arrivals_by_line(arrivals, line_ids):
 
     return {k: v for k, v in results.items() if v}
 
-def get_arrivals_by_line_simplified(station_id, line_ids):
-    arrivals = get_station_arrivals(station_id)
+def get_arrivals_by_line_simplified(station_id, line_ids, max_age=None):
+    arrivals = get_arrivals(stop_arrivals_url(station_id, line_ids), max_age, lines=set(line_ids))
     return group_arrivals_by_line(arrivals, line_ids)
 
-# Main Functions
-def get_arrivals_and_latest_location(station_id, platform_name):
-    arrivals = get_station_arrivals(station_id)
+def summarise_latest_location(arrivals, platform_name):
+    """Arrival times and the lead train's location for one platform."""
     platform_arrivals = group_arrivals_by_platform(arrivals, platform_name)
 
     if platform_arrivals:
         return {
-            'arrival_times': " | ".join(arrival['formattedTime'] for arrival in platform_arrivals),
-            'current_location': platform_arrivals[0].get('currentLocation', "Not Available")
+            'arrival_times': " | ".join(format_arrival(arrival) for arrival in platform_arrivals),
+            'current_location': platform_arrivals[0].current_location if platform_arrivals[0].current_location is not None else "Not Available"
         }
     return {'arrival_times': "", 'current_location': "Not Available"}
 
-def get_arrivals_and_destination(station_id, platform_name):
-    arrivals = get_station_arrivals(station_id)
+def summarise_destinations(arrivals, platform_name):
+    """Arrival times per destination for one platform."""
     platform_arrivals = group_arrivals_by_platform(arrivals, platform_name)
 
     destinations = {}
     for arrival in platform_arrivals:
-        destination = arrival.get('destinationName') or arrival.get('towards', 'Unknown Destination')
-        destinations.setdefault(destination, []).append(arrival['formattedTime'])
+        destinations.setdefault(arrival.destination, []).append(format_arrival(arrival))
 
     return [
         {'destination': dest, 'arrival_times': " | ".join(times)}
         for dest, times in destinations.items()
     ]
 
-def fetch_bus_arrivals_concurrently(bus_list):
-    """Fetch arrivals concurrently for multiple bus stations and lines."""
-    with concurrent.futures.ThreadPoolExecutor(max_workers=len(bus_list)) as executor:
-        future_to_bus_info = {
-            executor.submit(
-                get_arrivals_by_line_simplified, bus['station_id'], bus['lineId']
-            ): bus
-            for bus in bus_list
+# Main Functions
+def get_platform_arrivals(station_id, platform_name, max_age=None):
+    return get_arrivals(stop_arrivals_url(station_id), max_age, platforms={platform_name})
+
+def get_arrivals_and_latest_location(station_id, platform_name, max_age=None):
+    return summarise_latest_location(get_platform_arrivals(station_id, platform_name, max_age), platform_name)
+
+def get_arrivals_and_destination(station_id, platform_name, max_age=None):
+    return summarise_destinations(get_platform_arrivals(station_id, platform_name, max_age), platform_name)
+
+class ArrivalsBatch:
+    """Collects every stop a refresh needs and fetches each distinct query once.
+
+    TfL's arrivals endpoints take a single stop, so the plan has one request per
+    distinct stop. A stop only wanted for some lines uses the smaller line-scoped
+    query; otherwise the whole stop is fetched and serves every consumer. Each
+    response is decoded keeping only the platforms and lines someone asked for.
+    """
+
+    def __init__(self):
+        self._needs = {}  # station_id -> {'whole': bool, 'platforms': set, 'lines': set, 'max_age': seconds or None}
+        self.stale = set()  # stops that failed or missed the deadline on the last execute()
+
+    def _need(self, station_id, max_age=None):
+        need = self._needs.setdefault(station_id, {'whole': False, 'platforms': set(), 'lines': set(), 'max_age': None})
+        if max_age is not None:
+            # Consumers sharing a stop get the freshest data any of them asked for
+            need['max_age'] = max_age if need['max_age'] is None else min(need['max_age'], max_age)
+        return need
+
+    def add_station(self, station_id, platform_name=None, max_age=None):
+        """Need a stop's arrivals, on one platform or (by default) all of them.
+
+        max_age overrides the server's freshness lifetime for this stop's cached response.
+        """
+        need = self._need(station_id, max_age)
+        if platform_name is None:
+            need['whole'] = True
+        else:
+            need['platforms'].add(platform_name)
+
+    def add_lines(self, station_id, line_ids, max_age=None):
+        self._need(station_id, max_age)['lines'].update(line_ids)
+
+    def plan(self):
+        """Return {station_id: url} for the upstream requests this batch will make."""
+        return {
+            station_id: stop_arrivals_url(station_id, None if need['whole'] or need['platforms'] else need['lines'])
+            for station_id, need in self._needs.items()
         }
-        results_dict = {}
-        for future in concurrent.futures.as_completed(future_to_bus_info):
-            bus_info = future_to_bus_info[future]
-            try:
-                results = future.result()
-                results_dict[bus_info['station_id']] = results
-            except Exception as exc:
-                print(f"Error fetching data for station {bus_info['station_id']}: {exc}")
-        return results_dict
+
+    def calls(self, max_age=None):
+        """Return {station_id: (fn, *args)} fetching each planned request, raising on failure.
+
+        max_age applies to stops added without one of their own.
+        """
+        calls = {}
+        for station_id, url in self.plan().items():
+            need = self._needs[station_id]
+            stop_max_age = max_age if need['max_age'] is None else need['max_age']
+            if need['whole']:
+                calls[station_id] = (fetch_arrivals, url, stop_max_age)
+            else:
+                calls[station_id] = (fetch_arrivals, url, stop_max_age, need['platforms'] or None, need['lines'] or None)
+        return calls
+
+    def execute(self, deadline=FETCH_DEADLINE, max_age=None):
+        """Fetch every planned request in parallel and return {station_id: arrivals}.
+
+        Stops that fail or are still in flight at the deadline are left out
+        and listed in self.stale.
+        """
+        results, self.stale = run_before_deadline(self.calls(max_age), deadline)
+        return results
+
+def fetch_bus_arrivals_concurrently(bus_list, deadline=FETCH_DEADLINE):
+    """Fetch arrivals concurrently for multiple bus stations and lines."""
+    calls = {
+        bus['station_id']: (get_arrivals_by_line_simplified, bus['station_id'], bus['lineId'], bus.get('max_age'))
+        for bus in bus_list
+    }
+    results_dict, _ = run_before_deadline(calls, deadline)
+    return results_dict